@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+
+# Usage:
+#   python benchmarks/bench_chatbot.py                          # 10 and 10k users, compare with baseline
+#   python benchmarks/bench_chatbot.py --sizes 10,10000,1000000 --backend sqlite
+#   python benchmarks/bench_chatbot.py --save-baseline          # record the current numbers as the baseline
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+from datetime import date, timedelta
+
+# Run fully offline: stub LLM, no reminder thread, no knowledge-base index
+os.environ.setdefault("LLM_BACKEND", "stub")
+os.environ.setdefault("REMINDER_INTERVAL_SECONDS", "0")
+os.environ.setdefault("KNOWLEDGE_BASE_DIR", tempfile.gettempdir())
+os.environ["RESPONSE_CACHE"] = "off"  # Cache hits would hide the work we want to measure
+
+# Add the project's root directory to sys.path so we can import the main module.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import chatbot
+from profile_store import create_profile_store
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(BENCH_DIR, "baseline.json")
+
+MAJORS = ["Computer Science", "Biology", "Psychology", "Nursing", "Software Engineering", "Business"]
+UNIVERSITIES = ["Centennial College", "University of Toronto", "centennial college", "Unknown Uni"]
+MESSAGES = [
+    "I'm stressed about exams",
+    "What's on my schedule this week?",
+    "I feel like I'm falling behind and nothing is working",
+    "Had a great day, finally finished my project!",
+    "Can you help me plan my study time?",
+    "I hate how tired I am all the time",
+]
+
+# -------------------------------
+# Synthetic Data
+# -------------------------------
+
+def synthetic_profile(rng, user_index):
+    today = date.today()
+    return {
+        "name": f"student{user_index}",
+        "major": rng.choice(MAJORS),
+        "year_of_study": str(rng.randint(1, 4)),
+        "common_stressors": "assignments and exams",
+        "university": rng.choice(UNIVERSITIES),
+        "last_emotion": rng.choice(["sad", "frustrated", "neutral", "happy"]),
+        "last_conversation": "The student talked about managing coursework and sleep.",
+        "deadlines": {
+            f"Task {n}": (today + timedelta(days=rng.randint(-2, 30))).isoformat() for n in range(5)
+        },
+    }
+
+def write_synthetic_store(path, users, seed=0):
+    """Stream `users` profiles into a user_data.json file without holding them all in memory."""
+    rng = random.Random(seed)
+    with open(path, "w") as file:
+        file.write("{")
+        for user_index in range(users):
+            separator = "," if user_index else ""
+            file.write(f'{separator}\n"student{user_index}": {json.dumps(synthetic_profile(rng, user_index))}')
+        file.write("\n}")
+
+def synthetic_history(turns, seed=0):
+    rng = random.Random(seed)
+    return [(rng.choice(MESSAGES), "That sounds hard. What would help most right now? " * 3) for _ in range(turns)]
+
+# -------------------------------
+# Measurement
+# -------------------------------
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def measure(fn, min_time, min_iters=3, max_iters=100000):
+    """Call fn repeatedly for about `min_time` seconds and summarize the latencies."""
+    latencies = []
+    started = time.perf_counter()
+    while len(latencies) < max_iters and (len(latencies) < min_iters or time.perf_counter() - started < min_time):
+        call_started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - call_started)
+    total = sum(latencies)
+
+    # One more call under tracemalloc for peak memory (it slows calls, so it is not timed)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "iterations": len(latencies),
+        "ops_per_sec": round(len(latencies) / total, 2) if total else None,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 4),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 4),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 4),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+# -------------------------------
+# Benchmarks
+# -------------------------------
+
+def store_benchmarks(users, rng, history_turns):
+    """Benchmarks whose cost depends on how many users are stored."""
+    user_ids = [f"student{rng.randrange(users)}" for _ in range(1000)]
+    pick = lambda: rng.choice(user_ids)
+    snapshot = chatbot.load_user_data()  # Written back by the save benchmark
+    history = synthetic_history(history_turns)
+    return {
+        "load_user_data": chatbot.load_user_data,
+        "save_user_data": lambda: chatbot.save_user_data(snapshot),
+        "get_user_profile": lambda: chatbot.get_user_profile(pick()),
+        "update_user_data": lambda: chatbot.update_user_data(pick(), "last_emotion", rng.choice(["sad", "happy"])),
+        "check_deadlines": lambda: chatbot.check_deadlines(pick()),
+        # Same user each call, so this measures steady-state prompt assembly rather than summary folding
+        "build_messages": lambda: chatbot.build_messages(rng.choice(MESSAGES), history, "student0"),
+        "chatbot_response": lambda: chatbot.chatbot_response(rng.choice(MESSAGES), list(history[-3:]), pick()),
+    }
+
+def run(sizes, backend, history_turns, min_time, only=None):
+    results = {}
+    rng = random.Random(42)
+
+    sentiment_texts = [rng.choice(MESSAGES) for _ in range(1000)]
+    results["sentiment"] = {
+        "analyze_sentiment": measure(lambda: chatbot.analyze_sentiment(rng.choice(sentiment_texts)), min_time),
+        "analyze_sentiment_batch_1k": measure(lambda: chatbot.analyze_sentiment_batch(sentiment_texts), min_time, min_iters=1),
+    }
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for users in sizes:
+            json_path = os.path.join(tmp_dir, f"users_{users}.json")
+            db_path = os.path.join(tmp_dir, f"users_{users}.sqlite3")
+            print(f"Generating {users} synthetic users...", file=sys.stderr)
+            write_synthetic_store(json_path, users)
+            chatbot.set_profile_store(create_profile_store(backend, json_path, db_path))
+
+            group = {}
+            for name, fn in store_benchmarks(users, rng, history_turns).items():
+                if only and name not in only:
+                    continue
+                print(f"  {backend}/{users} {name}", file=sys.stderr)
+                group[name] = measure(fn, min_time)
+            results[f"{backend}/{users}"] = group
+            chatbot.set_profile_store(None)
+    return results
+
+# -------------------------------
+# Baseline Comparison
+# -------------------------------
+
+def compare(results, baseline, tolerance):
+    """Print p50 changes against the baseline; return the names of regressions."""
+    regressions = []
+    for group, benches in results.items():
+        for name, stats in benches.items():
+            old = baseline.get(group, {}).get(name)
+            label = f"{group} {name}"
+            if not old:
+                print(f"{label:<45} p50 {stats['p50_ms']:>10.4f} ms   (no baseline)")
+                continue
+            ratio = stats["p50_ms"] / old["p50_ms"] if old["p50_ms"] else 1.0
+            flag = "REGRESSION" if ratio > 1 + tolerance else ""
+            print(f"{label:<45} p50 {stats['p50_ms']:>10.4f} ms   x{ratio:5.2f} vs baseline {flag}")
+            if flag:
+                regressions.append(label)
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for chatbot.py hot paths (offline, stub LLM).")
+    parser.add_argument("--sizes", default="10,10000", help="Comma-separated user counts, e.g. 10,10000,1000000")
+    parser.add_argument("--backend", default="json", choices=["json", "sqlite"])
+    parser.add_argument("--history-turns", type=int, default=200, help="Turns in the synthetic chat history")
+    parser.add_argument("--min-time", type=float, default=1.0, help="Seconds to spend on each benchmark")
+    parser.add_argument("--only", default="", help="Comma-separated benchmark names to run")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p50 slowdown before flagging (0.25 = 25%%)")
+    parser.add_argument("--output", help="Also write the raw results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    only = set(filter(None, args.only.split(",")))
+    results = run(sizes, args.backend, args.history_turns, args.min_time, only)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=4)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)
+    regressions = compare(results, baseline, args.tolerance)
+
+    if args.save_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w") as file:
+            json.dump(baseline, file, indent=4)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
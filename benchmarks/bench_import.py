@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+# Usage:
+#   python benchmarks/bench_import.py                     # fails if `import chatbot` exceeds the budget
+#   python benchmarks/bench_import.py --budget-ms 150 --runs 20
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Default cold-start budget for `import chatbot` (median over fresh interpreters)
+IMPORT_BUDGET_MS = 250
+# Dependencies that must only load on first use
+HEAVY_MODULES = ["gradio", "langchain_groq", "vaderSentiment", "numpy", "sentence_transformers"]
+
+PROBE = """
+import sys, time, json
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"ms": elapsed * 1000, "heavy": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+# -------------------------------
+# Measurement
+# -------------------------------
+
+def cold_import(module):
+    """Import `module` in a fresh interpreter; returns (milliseconds, heavy modules it pulled in)."""
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    return result["ms"], result["heavy"]
+
+def measure(module, runs):
+    timings = []
+    heavy = set()
+    for _ in range(runs):
+        elapsed, loaded = cold_import(module)
+        timings.append(elapsed)
+        heavy.update(loaded)
+    timings.sort()
+    return {"median_ms": round(timings[len(timings) // 2], 1), "max_ms": round(timings[-1], 1), "heavy": sorted(heavy)}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold-start import time of the chatbot core module.")
+    parser.add_argument("--module", default="chatbot", help="Module held to the budget")
+    parser.add_argument("--runs", type=int, default=10, help="Fresh interpreters to start")
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS, help="Allowed median import time")
+    parser.add_argument("--compare", default="gradio,langchain_groq", help="Comma-separated modules to time for reference only")
+    args = parser.parse_args(argv)
+
+    result = measure(args.module, args.runs)
+    over_budget = result["median_ms"] > args.budget_ms
+    print(f"{args.module:<20} median {result['median_ms']:>8.1f} ms   max {result['max_ms']:>8.1f} ms   "
+          f"budget {args.budget_ms:.0f} ms {'OVER BUDGET' if over_budget else 'ok'}")
+    if result["heavy"]:
+        print(f"  eagerly imported: {', '.join(result['heavy'])}")
+
+    for module in filter(None, args.compare.split(",")):
+        reference = measure(module, max(1, args.runs // 5))
+        print(f"{module:<20} median {reference['median_ms']:>8.1f} ms   (reference)")
+
+    return 1 if over_budget or result["heavy"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
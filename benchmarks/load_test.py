@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+
+# Usage:
+#   python benchmarks/load_test.py --concurrency 1,10,50,100 --llm-latency 0.8
+#   python benchmarks/load_test.py --mode async --backend sqlite
+#   LLM_BACKEND=stub python chatbot.py &  python benchmarks/load_test.py --mode http --url http://127.0.0.1:7860
+
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+parser = argparse.ArgumentParser(description="Replay simulated student sessions against the chatbot at rising concurrency.")
+parser.add_argument("--mode", default="threads", choices=["threads", "async", "http"],
+                    help="threads: chatbot_response in a thread pool; async: chatbot_response_async; http: a running Gradio app")
+parser.add_argument("--url", default="http://127.0.0.1:7860", help="App URL for --mode http")
+parser.add_argument("--concurrency", default="1,10,50", help="Comma-separated numbers of simultaneous sessions")
+parser.add_argument("--sessions", type=int, default=0, help="Sessions per level (default: 2x the concurrency)")
+parser.add_argument("--turns", type=int, default=5, help="Chat turns per session")
+parser.add_argument("--llm-latency", type=float, default=0.5, help="Seconds the stub LLM takes per call (in-process modes)")
+parser.add_argument("--llm-max-concurrency", type=int, default=None, help="Override LLM_MAX_CONCURRENCY for in-process modes")
+parser.add_argument("--backend", default="json", choices=["json", "sqlite"], help="Profile store for in-process modes")
+parser.add_argument("--think-time", type=float, default=0.0, help="Seconds a simulated student waits between turns")
+
+# The stub LLM settings must be in the environment before chatbot is imported
+if __name__ == "__main__":
+    ARGS = parser.parse_args()
+    os.environ["LLM_BACKEND"] = "stub"
+    os.environ["LLM_STUB_LATENCY"] = str(ARGS.llm_latency)
+    if ARGS.llm_max_concurrency:
+        os.environ["LLM_MAX_CONCURRENCY"] = str(ARGS.llm_max_concurrency)
+
+from bench_chatbot import MESSAGES, MAJORS, UNIVERSITIES, percentile
+import chatbot
+from profile_store import create_profile_store
+
+# -------------------------------
+# Simulated Sessions
+# -------------------------------
+
+def session_script(session_index, turns):
+    rng = random.Random(session_index)
+    user_id = f"load_student{session_index}"
+    profile = (user_id, rng.choice(MAJORS), str(rng.randint(1, 4)), "exams", rng.choice(UNIVERSITIES))
+    return profile, [rng.choice(MESSAGES) for _ in range(turns)]
+
+class Recorder:
+    """Thread-safe collection of per-turn latencies and errors."""
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.error_samples = []
+        self._lock = threading.Lock()
+
+    def record(self, started, error=None):
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            if error is None:
+                self.latencies.append(elapsed)
+            else:
+                self.errors += 1
+                if len(self.error_samples) < 3:
+                    self.error_samples.append(repr(error))
+
+def run_session_threads(session_index, turns, think_time, recorder):
+    profile, messages = session_script(session_index, turns)
+    chatbot.setup_profile(*profile)
+    history = []
+    for message in messages:
+        started = time.perf_counter()
+        try:
+            _, history = chatbot.chatbot_response(message, history, profile[0])
+            recorder.record(started)
+        except Exception as error:
+            recorder.record(started, error)
+        time.sleep(think_time)
+
+async def run_session_async(session_index, turns, think_time, recorder):
+    profile, messages = session_script(session_index, turns)
+    await asyncio.to_thread(chatbot.setup_profile, *profile)
+    history = []
+    for message in messages:
+        started = time.perf_counter()
+        try:
+            _, history = await chatbot.chatbot_response_async(message, history, profile[0])
+            recorder.record(started)
+        except Exception as error:
+            recorder.record(started, error)
+        await asyncio.sleep(think_time)
+
+def run_session_http(url, session_index, turns, think_time, recorder):
+    from gradio_client import Client  # Only needed when driving a live app
+    profile, messages = session_script(session_index, turns)
+    client = Client(url, verbose=False)  # One client = one Gradio session with its own state
+    client.predict(*profile, api_name="/setup_profile")
+    for message in messages:
+        started = time.perf_counter()
+        try:
+            client.predict(message, api_name="/respond")
+            recorder.record(started)
+        except Exception as error:
+            recorder.record(started, error)
+        time.sleep(think_time)
+
+# -------------------------------
+# Load Levels
+# -------------------------------
+
+def run_level(args, concurrency):
+    sessions = args.sessions or concurrency * 2
+    recorder = Recorder()
+    started = time.perf_counter()
+    if args.mode == "async":
+        async def drive():
+            limit = asyncio.Semaphore(concurrency)
+
+            async def one(index):
+                async with limit:
+                    await run_session_async(index, args.turns, args.think_time, recorder)
+
+            await asyncio.gather(*(one(index) for index in range(sessions)))
+        asyncio.run(drive())
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            if args.mode == "http":
+                futures = [pool.submit(run_session_http, args.url, index, args.turns, args.think_time, recorder) for index in range(sessions)]
+            else:
+                futures = [pool.submit(run_session_threads, index, args.turns, args.think_time, recorder) for index in range(sessions)]
+            for future in futures:
+                future.result()
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(recorder.latencies)
+    total = len(latencies) + recorder.errors
+    return {
+        "concurrency": concurrency,
+        "turns": total,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 0.50) if latencies else float("nan"),
+        "p95": percentile(latencies, 0.95) if latencies else float("nan"),
+        "p99": percentile(latencies, 0.99) if latencies else float("nan"),
+        "error_rate": recorder.errors / total if total else 0.0,
+        "error_samples": recorder.error_samples,
+    }
+
+def main(args):
+    levels = [int(level) for level in args.concurrency.split(",")]
+    if args.mode == "http":
+        print(f"mode=http url={args.url} turns/session={args.turns}")
+    else:
+        print(f"mode={args.mode} turns/session={args.turns} llm_latency={args.llm_latency}s store={args.backend}")
+    print(f"{'conc':>6} {'turns':>7} {'turns/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>8}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.mode != "http":
+            store = create_profile_store(args.backend, os.path.join(tmp_dir, "users.json"), os.path.join(tmp_dir, "users.sqlite3"))
+            chatbot.set_profile_store(store)
+        for concurrency in levels:
+            result = run_level(args, concurrency)
+            print(
+                f"{result['concurrency']:>6} {result['turns']:>7} {result['throughput']:>9.2f} "
+                f"{result['p50'] * 1000:>9.1f} {result['p95'] * 1000:>9.1f} {result['p99'] * 1000:>9.1f} "
+                f"{result['error_rate']:>7.1%}"
+            )
+            for sample in result["error_samples"]:
+                print(f"       e.g. {sample}")
+        chatbot.set_profile_store(None)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(ARGS))
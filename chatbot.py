@@ -4,22 +4,112 @@
 
 import os
 import json
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-from langchain_groq import ChatGroq
 import datetime
+import time
 import random
-import gradio as gr
+import threading
+import asyncio
+import importlib
+import collections
+import multiprocessing
+from profile_store import create_profile_store
+from llm_client import LLMConfig, LLMClientRegistry, create_llm_backend
+from llm_dispatch import LLMDispatcher, LLMUnavailable, SqliteTokenBucket, PRIORITY_DISTRESS, PRIORITY_NORMAL, PRIORITY_BACKGROUND
+from conversation_context import ConversationContext
+from response_cache import ResponseCache, normalize_message, make_cache_key
+from deadlines import DeadlineIndex, ReminderScheduler
+from sessions import Session, SessionStore, SqliteSessionStore
+from post_conversation import PostConversationWorker
+from university_resources import ResourceIndex, MATCHER_VERSION
+from metrics import MetricsRegistry, SIZE_BUCKETS
+
+# Gradio, LangChain, VADER and the retrieval stack (numpy, sentence-transformers)
+# take seconds to import, so they load on first use; `import chatbot` only pulls
+# in the standard library and the project's own modules. The Gradio UI lives in
+# chatbot_ui.py; main and setup_profile are re-exported from here.
+_LAZY_IMPORTS = {
+    "ChatGroq": ("langchain_groq", "ChatGroq"),
+    "SentimentIntensityAnalyzer": ("vaderSentiment.vaderSentiment", "SentimentIntensityAnalyzer"),
+    "main": ("chatbot_ui", "main"),
+    "setup_profile": ("chatbot_ui", "setup_profile"),
+}
+
+def __getattr__(name):
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attribute = _LAZY_IMPORTS[name]
+    value = getattr(importlib.import_module(module_name), attribute)
+    globals()[name] = value  # Later lookups are plain global reads
+    return value
+
+def _lazy(name):
+    # Check globals first so a patched name (e.g. chatbot.ChatGroq in tests) wins
+    return globals()[name] if name in globals() else __getattr__(name)
 
 # -------------------------------
 # Helper Functions & Global Setup
 # -------------------------------
 
 USER_DATA_FILE = "user_data.json"
-
-UNIVERSITY_RESOURCES = {
-    "Centennial College": "Visit the Student Wellness Centre: https://www.centennialcollege.ca/student-health",
-    "University of Toronto": "Check U of T’s mental health services: https://mentalhealth.utoronto.ca/",
-}
+PROFILE_DB_FILE = os.environ.get("PROFILE_DB_FILE", "user_data.sqlite3")
+# "json" keeps the original single-file store; "sqlite" gives indexed per-user
+# reads/writes and imports user_data.json on first start
+PROFILE_STORE_BACKEND = os.environ.get("PROFILE_STORE_BACKEND", "json")
+# How many chat turns Gradio's queue runs at once, and how many may wait
+CHAT_CONCURRENCY_LIMIT = int(os.environ.get("CHAT_CONCURRENCY_LIMIT", 32))
+CHAT_QUEUE_MAX_SIZE = int(os.environ.get("CHAT_QUEUE_MAX_SIZE", 256))
+# Smaller sentiment batches are scored in-process; pool start-up would cost more than it saves
+SENTIMENT_POOL_MIN_BATCH = 2000
+# Prompt history limits: CONTEXT_MAX_TURNS to twice that many newest turns kept verbatim, older ones folded into a summary
+CONTEXT_MAX_TURNS = int(os.environ.get("CONTEXT_MAX_TURNS", 6))
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", 1500))
+# Optional LLM response cache: "off", "memory", or "disk" (memory backed by a SQLite file)
+RESPONSE_CACHE_MODE = os.environ.get("RESPONSE_CACHE", "off")
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", 1024))
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", 3600))
+RESPONSE_CACHE_FILE = os.environ.get("RESPONSE_CACHE_FILE", "response_cache.sqlite3")
+# Knowledge base built by ingest.py; retrieval is skipped until its index exists
+KNOWLEDGE_BASE_DIR = os.environ.get("KNOWLEDGE_BASE_DIR", "chroma_db")
+RETRIEVAL_TOP_K = int(os.environ.get("RETRIEVAL_TOP_K", 3))
+# Deadline reminders: how far ahead to look, and how often the background sweep runs (0 disables it)
+DEADLINE_LEAD_DAYS = 3
+REMINDER_INTERVAL_SECONDS = float(os.environ.get("REMINDER_INTERVAL_SECONDS", 3600))
+# Prometheus-style /metrics endpoint served next to the app (0, the default, disables it), and optional JSON log per turn
+METRICS_PORT = int(os.environ.get("METRICS_PORT", 0))
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")  # Set to 0.0.0.0 to let a remote Prometheus scrape it
+METRICS_JSON_LOG = os.environ.get("METRICS_JSON_LOG", "0") == "1"
+# Server-side chat sessions: total memory cap, idle time before eviction, and how often idle ones are swept
+SESSION_MEMORY_BUDGET_MB = float(os.environ.get("SESSION_MEMORY_BUDGET_MB", 256))
+SESSION_IDLE_TTL = float(os.environ.get("SESSION_IDLE_TTL", 1800))
+SESSION_SWEEP_INTERVAL = float(os.environ.get("SESSION_SWEEP_INTERVAL", 60))
+# Background profile bookkeeping: finished sessions summarized per LLM call, and how long jobs wait to be batched
+POST_CONVERSATION_BATCH_SIZE = int(os.environ.get("POST_CONVERSATION_BATCH_SIZE", 8))
+POST_CONVERSATION_MAX_DELAY = float(os.environ.get("POST_CONVERSATION_MAX_DELAY", 2.0))
+# LLM admission control: provider requests per second (0 = unlimited) and burst,
+# retries on rate-limit/server errors, and how many turns may queue for a slot and for how long
+LLM_RATE_LIMIT = float(os.environ.get("LLM_RATE_LIMIT", 0))
+LLM_RATE_BURST = int(os.environ.get("LLM_RATE_BURST", 5))
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", 3))
+LLM_RETRY_BASE_DELAY = float(os.environ.get("LLM_RETRY_BASE_DELAY", 0.5))
+LLM_RETRY_MAX_DELAY = float(os.environ.get("LLM_RETRY_MAX_DELAY", 8))
+LLM_QUEUE_SIZE = int(os.environ.get("LLM_QUEUE_SIZE", 64))
+LLM_QUEUE_TIMEOUT = float(os.environ.get("LLM_QUEUE_TIMEOUT", 20))
+# Sent instead of an LLM reply when the provider is saturated or failing
+DEGRADED_REPLY = (
+    "I'm getting a lot of messages right now and can't give you a full reply this moment. "
+    "Please try again in a minute; I'm still here for you."
+)
+# Multi-worker mode (see launcher.py): sessions and the LLM rate limit live in this
+# SQLite file so every worker process shares them; empty keeps them in-process.
+# Worker 0 also runs the once-per-deployment background jobs.
+SHARED_STATE_DB = os.environ.get("SHARED_STATE_DB", "")
+WORKER_ID = int(os.environ.get("CHATBOT_WORKER_ID", 0))
+
+# Institutions, aliases and wellness resources (JSON list or CSV), indexed once per process
+UNIVERSITY_RESOURCES_FILE = os.environ.get(
+    "UNIVERSITY_RESOURCES_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "university_resources.json"),
+)
 
 MOTIVATIONAL_QUOTES = [
     "Stay focused! Every small step brings you closer to success. 💪",
@@ -27,47 +117,111 @@ MOTIVATIONAL_QUOTES = [
     "Don’t let stress take over! Take breaks, breathe, and keep going. 🚀"
 ]
 
+# Stage timings, prompt sizes, token usage and cache hits for every chat turn
+metrics = MetricsRegistry(json_log=METRICS_JSON_LOG)
+
+_profile_store = None
+_profile_store_lock = threading.Lock()
+
+def get_profile_store():
+    global _profile_store
+    if _profile_store is None:
+        with _profile_store_lock:
+            if _profile_store is None:
+                _profile_store = create_profile_store(PROFILE_STORE_BACKEND, USER_DATA_FILE, PROFILE_DB_FILE)
+    return _profile_store
+
+def set_profile_store(store):
+    """Swap in another store (benchmarks, tools); None rebuilds the default on next use."""
+    global _profile_store
+    flush_post_conversation()  # Queued profile writes belong to the store they were made against
+    with _profile_store_lock:
+        _profile_store = store
+    reset_deadline_index()
+
+@metrics.span("profile_load_all")
 def load_user_data():
-    if os.path.exists(USER_DATA_FILE):
-        with open(USER_DATA_FILE, "r") as file:
-            return json.load(file)
-    return {}  # Return empty dict if file doesn't exist
+    return get_profile_store().load_all()  # Whole store; prefer get_user_profile on hot paths
 
+@metrics.span("profile_save_all")
 def save_user_data(user_data):
-    with open(USER_DATA_FILE, "w") as file:
-        json.dump(user_data, file, indent=4)  # indent=4 makes JSON human-readable
+    get_profile_store().save_all(user_data)
+    # Whole store replaced; re-index it, keeping track of deadlines already reminded about
+    _deadline_index.rebuild((user_id, profile.get("deadlines", {})) for user_id, profile in user_data.items())
+
+@metrics.span("profile_load")
+def get_user_profile(user_id):
+    return get_profile_store().get(user_id)  # Empty dict for unknown users
 
+@metrics.span("profile_update")
 def update_user_data(user_id, key, value):
-    user_data = load_user_data()
-    if user_id not in user_data:
-        user_data[user_id] = {}  # Initialize empty dict for new user
-    user_data[user_id][key] = value
-    save_user_data(user_data)
+    get_profile_store().update(user_id, {key: value})
+    if key == "deadlines":
+        _deadline_index.update(user_id, value)  # Keep the reminder heap current
 
+@metrics.span("profile_update")
 def update_student_profile(user_id, major, year_of_study, common_stressors, university):
-    user_data = load_user_data()
-    if user_id not in user_data:
-        user_data[user_id] = {}
-    # Store all profile details in user's data
-    user_data[user_id]["major"] = major
-    user_data[user_id]["year_of_study"] = year_of_study
-    user_data[user_id]["common_stressors"] = common_stressors
-    user_data[user_id]["university"] = university
-    save_user_data(user_data)
+    # Store all profile details in one atomic update
+    get_profile_store().update(user_id, {
+        "major": major,
+        "year_of_study": year_of_study,
+        "common_stressors": common_stressors,
+        "university": university,
+    })
+
+_resource_index = None
+_resource_index_lock = threading.Lock()
+
+def get_resource_index():
+    global _resource_index
+    if _resource_index is None:
+        with _resource_index_lock:
+            if _resource_index is None:
+                _resource_index = ResourceIndex.load(UNIVERSITY_RESOURCES_FILE)
+    return _resource_index
+
+def resolve_university(user_id, profile):
+    """
+    Canonical institution for the profile's university (None if unknown). The
+    result is cached on the profile next to the raw name it came from, so
+    later turns skip resolution until the student edits their university.
+    Misses are not cached: the name may match once the resource file grows.
+    Matches made by an older version of the matcher are resolved again.
+    """
+    university = profile.get("university")
+    if not university:
+        return None
+    cached = profile.get("resolved_university")
+    if cached and cached.get("name") == university and cached.get("version") == MATCHER_VERSION:
+        return cached["canonical"]
+    canonical = get_resource_index().resolve(university)
+    if canonical:
+        _post_conversation.submit_fields(
+            user_id, {"resolved_university": {"name": university, "canonical": canonical, "version": MATCHER_VERSION}}
+        )
+    return canonical
 
 def get_mental_health_resources(user_id):
-    user_data = load_user_data()
     # Default to generic message if university not specified
-    university = user_data.get(user_id, {}).get("university", "your university")
-    if university in UNIVERSITY_RESOURCES:
-        return f"If you need support, check out {UNIVERSITY_RESOURCES[university]}"
+    resource = get_resource_index().resource(resolve_university(user_id, get_user_profile(user_id)))
+    if resource:
+        return f"If you need support, check out {resource}"
     else:
         return "I recommend checking your university's website for student wellness resources."
 
-def analyze_sentiment(text):
-    analyzer = SentimentIntensityAnalyzer()
-    sentiment_scores = analyzer.polarity_scores(text)
-    compound_score = sentiment_scores["compound"]
+_sentiment_analyzer = None
+_sentiment_analyzer_lock = threading.Lock()
+
+def get_sentiment_analyzer():
+    # VADER parses its lexicon and emoji files on construction, so build it once per process
+    global _sentiment_analyzer
+    if _sentiment_analyzer is None:
+        with _sentiment_analyzer_lock:
+            if _sentiment_analyzer is None:
+                _sentiment_analyzer = _lazy("SentimentIntensityAnalyzer")()
+    return _sentiment_analyzer
+
+def classify_sentiment(compound_score):
     # Classify sentiment based on compound score thresholds
     if compound_score <= -0.5:
         return "sad"
@@ -80,14 +234,129 @@ def analyze_sentiment(text):
     else:
         return "excited"
 
-def load_llm():
-    return ChatGroq(
-        temperature=0.6,  # Controls randomness; 0.6 balances creativity and coherence
-        groq_api_key="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",
-        model_name="llama-3.3-70b-versatile"  # Specific LLM model used
+@metrics.span("sentiment")
+def analyze_sentiment(text):
+    sentiment_scores = get_sentiment_analyzer().polarity_scores(text)
+    return classify_sentiment(sentiment_scores["compound"])
+
+def analyze_sentiment_batch(texts, processes=None):
+    """
+    Label many texts (e.g. a whole conversation history or exported transcripts)
+    with the same buckets as analyze_sentiment. Pass `processes` to spread
+    batches of at least SENTIMENT_POOL_MIN_BATCH texts over a process pool.
+    """
+    texts = list(texts)
+    if processes and processes > 1 and len(texts) >= SENTIMENT_POOL_MIN_BATCH:
+        chunksize = max(1, len(texts) // (processes * 4))
+        with multiprocessing.Pool(processes) as pool:
+            return pool.map(analyze_sentiment, texts, chunksize=chunksize)
+    analyzer = get_sentiment_analyzer()
+    return [classify_sentiment(analyzer.polarity_scores(text)["compound"]) for text in texts]
+
+def create_response_cache(mode):
+    if mode == "off":
+        return None
+    if mode not in ("memory", "disk"):
+        raise ValueError(f"Unknown response cache mode: {mode}")
+    disk_path = RESPONSE_CACHE_FILE if mode == "disk" else None
+    return ResponseCache(max_entries=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL, disk_path=disk_path)
+
+_response_cache = create_response_cache(RESPONSE_CACHE_MODE)
+
+def response_cache_stats():
+    return _response_cache.stats() if _response_cache is not None else {"hits": 0, "misses": 0, "entries": 0}
+
+def lookup_cached_reply(cache_key):
+    if not cache_key:
+        return None
+    cached = _response_cache.get(cache_key)
+    metrics.inc("chatbot_response_cache_total", result="miss" if cached is None else "hit")
+    return cached
+
+metrics.gauge(
+    "chatbot_response_cache_entries",
+    lambda: {(): response_cache_stats()["entries"]},
+    "LLM responses held in the in-memory cache tier",
+)
+
+def record_llm_usage(response):
+    # LangChain chat models report token counts on the message (or final stream chunk)
+    usage = getattr(response, "usage_metadata", None)
+    if isinstance(usage, dict):
+        for kind in ("input", "output"):
+            metrics.inc("chatbot_llm_tokens_total", usage.get(f"{kind}_tokens", 0), kind=kind)
+
+def load_llm(config=None):
+    config = config or LLMConfig.from_env()  # Model, temperature and key come from the environment
+    if config.backend != "groq":
+        return create_llm_backend(config)  # e.g. LLM_BACKEND=stub for offline runs
+    if not config.api_key:
+        raise ValueError("GROQ_API_KEY is not set; export it, or use LLM_BACKEND=stub for offline runs")
+    return _lazy("ChatGroq")(
+        temperature=config.temperature,  # Controls randomness; 0.6 balances creativity and coherence
+        groq_api_key=config.api_key,
+        model_name=config.model_name  # Specific LLM model used
     )
 
-def generate_summary(conversation_history, llm):
+# Clients are built once per config and reused, so each turn skips client
+# setup and the TLS handshake
+_llm_clients = LLMClientRegistry(lambda config: load_llm(config))
+
+def get_llm(config=None):
+    return _llm_clients.get(config or LLMConfig.from_env())
+
+_llm_dispatcher = None
+_llm_dispatcher_lock = threading.Lock()
+
+def get_llm_dispatcher():
+    """Process-wide admission control, rate limiting and retries for LLM calls."""
+    global _llm_dispatcher
+    if _llm_dispatcher is None:
+        with _llm_dispatcher_lock:
+            if _llm_dispatcher is None:
+                _llm_dispatcher = LLMDispatcher(
+                    max_concurrency=LLMConfig.from_env().max_concurrency,
+                    max_queue=LLM_QUEUE_SIZE,
+                    queue_timeout=LLM_QUEUE_TIMEOUT,
+                    rate=LLM_RATE_LIMIT,
+                    burst=LLM_RATE_BURST,
+                    max_retries=LLM_MAX_RETRIES,
+                    base_delay=LLM_RETRY_BASE_DELAY,
+                    max_delay=LLM_RETRY_MAX_DELAY,
+                    # One provider rate limit for all workers
+                    bucket=SqliteTokenBucket(SHARED_STATE_DB, LLM_RATE_LIMIT, LLM_RATE_BURST) if SHARED_STATE_DB else None,
+                )
+    return _llm_dispatcher
+
+metrics.gauge(
+    "chatbot_llm_dispatch",
+    lambda: {(("state", state),): count for state, count in get_llm_dispatcher().stats().items()},
+    "LLM calls in flight, and chat turns queued for a slot",
+)
+
+def reset_llm_clients():
+    global _llm_dispatcher
+    _llm_clients.clear()
+    with _llm_dispatcher_lock:
+        _llm_dispatcher = None
+
+def turn_priority(context):
+    # Students in distress (or asking for help) are answered first when the LLM is busy
+    if context["sentiment"] in ["sad", "frustrated"] or "resource_info" in context:
+        return PRIORITY_DISTRESS
+    return PRIORITY_NORMAL
+
+def degraded_reply(user_id, context, error):
+    """Immediate fallback reply (never cached) when no LLM reply is available."""
+    metrics.inc("chatbot_llm_degraded_total", reason=error.reason)
+    resources = context.get("resource_info") or get_mental_health_resources(user_id)
+    return f"{DEGRADED_REPLY}\n\n{resources}"
+
+def generate_summary(conversation_history, llm, priority=PRIORITY_NORMAL):
+    cache_key = make_cache_key("summary", *conversation_history) if _response_cache is not None else None
+    cached = lookup_cached_reply(cache_key)
+    if cached is not None:
+        return cached
     prompt = f"""
     You are a helpful assistant. Summarize this conversation in 1-2 sentences.
 
@@ -96,22 +365,160 @@ def generate_summary(conversation_history, llm):
 
     Summary:
     """
-    response = llm.invoke(prompt)
-    return response.content.strip()
+    with metrics.span("summary_llm_call"):
+        response = get_llm_dispatcher().call(lambda: llm.invoke(prompt), priority)
+    record_llm_usage(response)
+    summary = response.content.strip()
+    if cache_key:
+        _response_cache.set(cache_key, summary)
+    return summary
+
+def summarize_conversations(conversations):
+    """
+    Summarize several conversations (lists of lines) with one LLM call.
+    Falls back to one generate_summary call each if the reply is not a JSON
+    array with one summary per conversation.
+    """
+    if len(conversations) > 1:
+        blocks = "\n\n".join(f"Conversation {n}:\n" + " ".join(lines) for n, lines in enumerate(conversations, start=1))
+        prompt = f"""
+    You are a helpful assistant. Summarize each conversation below in 1-2 sentences.
+    Reply with only a JSON array of {len(conversations)} strings, one summary per conversation, in order.
+
+    {blocks}
+    """
+        llm = get_llm()
+        with metrics.span("summary_llm_call"):
+            response = get_llm_dispatcher().call(lambda: llm.invoke(prompt), PRIORITY_BACKGROUND)
+        record_llm_usage(response)
+        try:
+            summaries = json.loads(response.content.strip())
+        except ValueError:
+            summaries = None
+        if isinstance(summaries, list) and len(summaries) == len(conversations) and all(isinstance(text, str) for text in summaries):
+            return [text.strip() for text in summaries]
+    return [generate_summary(lines, get_llm(), PRIORITY_BACKGROUND) for lines in conversations]
+
+# Sentiment trends, session summaries and summary write-backs are applied in
+# batches by a background thread, so the next session's prompt stays current
+# without a second LLM call or extra profile writes on the chat turn
+_post_conversation = PostConversationWorker(
+    summarize_many=summarize_conversations,
+    write_many=lambda items: get_profile_store().update_many(items),
+    batch_size=POST_CONVERSATION_BATCH_SIZE,
+    max_delay=POST_CONVERSATION_MAX_DELAY,
+    autostart=True,
+)
+
+metrics.gauge(
+    "chatbot_post_conversation_jobs",
+    lambda: {(("state", "pending"),): _post_conversation.pending(), (("state", "dropped"),): _post_conversation.dropped},
+    "Background profile jobs waiting, and jobs dropped because the queue was full",
+)
+
+def start_post_conversation_worker():
+    _post_conversation.start()
+
+def flush_post_conversation():
+    return _post_conversation.flush()
+
+def record_turn_emotion(user_id, history, sentiment):
+    # A session's last_emotion is written once, when it ends (see persist_session_summary)
+    _post_conversation.submit_turn(user_id, sentiment, set_last=not isinstance(history, Session))
+
+# Older turns are summarized with generate_summary and the running summary is
+# saved as the user's last_conversation
+_conversation_context = ConversationContext(
+    summarize=lambda lines: generate_summary(lines, get_llm()),
+    max_turns=CONTEXT_MAX_TURNS,
+    token_budget=CONTEXT_TOKEN_BUDGET,
+    on_summary=lambda key, summary: _post_conversation.submit_fields(key[0], {"last_conversation": summary}),
+)
+
+def conversation_key(user_id, history):
+    # Fold state belongs to one conversation, so a user's parallel sessions do not share it
+    return user_id, history.session_id if isinstance(history, Session) else None
+
+_deadline_index = DeadlineIndex()
 
 def check_deadlines(user_id):
-    user_data = load_user_data()
-    deadlines = user_data.get(user_id, {}).get("deadlines", {})
+    deadlines = get_user_profile(user_id).get("deadlines", {})
     today = datetime.date.today()
-    # Check for deadlines within next 3 days
-    upcoming = [
-        task for task, date in deadlines.items()
-        if datetime.date.fromisoformat(date) <= today + datetime.timedelta(days=3)
-    ]
+    # Check for deadlines within next 3 days (dates are parsed and sorted once per change)
+    upcoming = _deadline_index.upcoming(user_id, deadlines, today + datetime.timedelta(days=DEADLINE_LEAD_DAYS))
     if upcoming:
         return f"Reminder! You have upcoming deadlines: {', '.join(upcoming)}. Don’t forget to plan ahead!"
     return "No major deadlines soon. Keep up the good work!"
 
+def deliver_deadline_reminder(user_id, tasks):
+    # Pair the reminder with a motivational quote; it is shared on the user's next chat turn
+    message = f"Reminder! You have upcoming deadlines: {', '.join(tasks)}. {send_daily_motivation()}"
+    pending = get_user_profile(user_id).get("pending_reminder")
+    if pending:
+        message = f"{pending}\n{message}"  # The student has not seen the earlier reminder yet
+    update_user_data(user_id, "pending_reminder", message)
+
+def pop_pending_reminder(user_id, profile):
+    reminder = profile.get("pending_reminder")
+    if reminder:
+        update_user_data(user_id, "pending_reminder", None)  # Deliver each reminder once
+    return reminder
+
+_deadline_version = None  # Profile store version the deadline index has caught up to
+
+def refresh_deadline_index():
+    """Index the deadlines of every profile written since the last refresh, by any process."""
+    global _deadline_version
+    version, changed = get_profile_store().changed_since(_deadline_version)
+    for user_id, profile in changed:
+        _deadline_index.update(user_id, profile.get("deadlines", {}))
+    _deadline_version = version  # Only once indexed, so a failed refresh is retried next sweep
+    return len(changed)
+
+def reset_deadline_index():
+    global _deadline_version
+    _deadline_index.clear()
+    _deadline_version = None
+
+_reminder_scheduler = None
+
+def start_reminder_scheduler():
+    """Sweep for due deadlines in the background, re-indexing changed profiles before each sweep."""
+    global _reminder_scheduler
+    if _reminder_scheduler is None and REMINDER_INTERVAL_SECONDS > 0:
+        _reminder_scheduler = ReminderScheduler(
+            _deadline_index,
+            deliver_deadline_reminder,
+            interval=REMINDER_INTERVAL_SECONDS,
+            lead_days=DEADLINE_LEAD_DAYS,
+            refresh=refresh_deadline_index,
+        )
+        _reminder_scheduler.start()
+    return _reminder_scheduler
+
+_retriever = None
+_retriever_loaded = False
+_retriever_lock = threading.Lock()
+
+def get_retriever():
+    """Knowledge-base retriever, or None if ingest.py has not built an index yet."""
+    global _retriever, _retriever_loaded
+    if not _retriever_loaded:
+        with _retriever_lock:
+            if not _retriever_loaded:
+                from retrieval import VectorIndex, Retriever, SentenceTransformerEmbedder  # numpy and friends
+                index = VectorIndex.load(KNOWLEDGE_BASE_DIR)  # Memory-mapped, loaded once per process
+                if index is not None and len(index):
+                    _retriever = Retriever(index, SentenceTransformerEmbedder())
+                _retriever_loaded = True
+    return _retriever
+
+def retrieve_passages(user_message):
+    retriever = get_retriever()
+    if retriever is None or RETRIEVAL_TOP_K <= 0:
+        return []
+    return retriever.retrieve(user_message, RETRIEVAL_TOP_K)
+
 def send_daily_motivation():
     return random.choice(MOTIVATIONAL_QUOTES)  # Randomly select a quote
 
@@ -119,117 +526,378 @@ def send_daily_motivation():
 # Chatbot Function for Gradio Interface
 # -----------------------------------------
 
-def chatbot_response(user_message, history, user_id):
+def gather_context(user_message, user_id):
     """
-    This function takes the latest user message, the conversation history,
-    and the user_id. It constructs a conversation prompt (as a string) for the LLM,
-    updates the internal history, and returns the UI history in the expected format.
-    """
-    llm = load_llm()
-    user_data = load_user_data()
-    major = user_data.get(user_id, {}).get("major", "student")  # Default to "student" if no major
-
-    messages = []
-
-    # Construct system message with user context
-    system_content = (
-        f"You are a mental health assistant for students. The user is studying {major}.\n"
-        f"- Name: {user_id}\n"
-        f"- Last emotion: {user_data.get(user_id, {}).get('last_emotion', 'None')}\n"
-        f"- Last conversation: {user_data.get(user_id, {}).get('last_conversation', 'None')}\n\n"
-        "Respond with empathy and helpful advice. Keep your responses brief and focused.\n"
-        "Ask at most one follow-up question per response. Prioritize clarity and conciseness."
-    )
-
+    Collect the per-turn context the prompt needs: the user's profile, the
+    message sentiment, knowledge-base passages and, when relevant, deadline
+    and resource info.
+    """
+    context = {"profile": get_user_profile(user_id), "sentiment": analyze_sentiment(user_message)}
+    passages = retrieve_passages(user_message)
+    if passages:
+        context["passages"] = passages
+    reminder = pop_pending_reminder(user_id, context["profile"])
+    if reminder:
+        context["reminder"] = reminder
     if "schedule" in user_message.lower():
-        deadline_info = check_deadlines(user_id)
-        system_content += f"\n- Upcoming deadlines: {deadline_info}\nInclude these deadlines in your response."
+        context["deadline_info"] = check_deadlines(user_id)
+    if context["sentiment"] in ["sad", "frustrated"] or "help" in user_message.lower():
+        context["resource_info"] = get_mental_health_resources(user_id)
+    return context
 
-    sentiment = analyze_sentiment(user_message)
+async def gather_context_async(user_message, user_id):
+    """
+    Async counterpart of gather_context. The lookups are independent, so they
+    run concurrently in worker threads; resources are fetched speculatively
+    and dropped if the sentiment check does not call for them.
+    """
+    wants_deadlines = "schedule" in user_message.lower()
+    profile, sentiment, passages, deadline_info, resource_info = await asyncio.gather(
+        asyncio.to_thread(get_user_profile, user_id),
+        asyncio.to_thread(analyze_sentiment, user_message),
+        asyncio.to_thread(retrieve_passages, user_message),
+        asyncio.to_thread(check_deadlines, user_id) if wants_deadlines else _none(),
+        asyncio.to_thread(get_mental_health_resources, user_id),
+    )
+    context = {"profile": profile, "sentiment": sentiment}
+    if passages:
+        context["passages"] = passages
+    if profile.get("pending_reminder"):
+        context["reminder"] = await asyncio.to_thread(pop_pending_reminder, user_id, profile)
+    if wants_deadlines:
+        context["deadline_info"] = deadline_info
     if sentiment in ["sad", "frustrated"] or "help" in user_message.lower():
-        resource_info = get_mental_health_resources(user_id)
-        system_content += f"\n- Mental health resources: {resource_info}\nIf resources are provided, include them in your response to support the user."
-
-    messages.append({"role": "system", "content": system_content})
-
-    # Add history to messages
-    for pair in history:
-        user_text, bot_text = pair
-        messages.append({"role": "user", "content": user_text})
-        messages.append({"role": "assistant", "content": bot_text})
-
-    messages.append({"role": "user", "content": user_message})
-
-    # Convert messages list to a single string for LLM
-    prompt_str = ""
-    for msg in messages:
-        role = msg["role"].capitalize()
-        prompt_str += f"{role}: {msg['content']}\n"
-
-    response = llm.invoke(prompt_str)
-    bot_reply = response.content.strip()
-
-    history.append((user_message, bot_reply))
-
+        context["resource_info"] = resource_info
+    return context
+
+async def _none():
+    return None
+
+# Stable part of each conversation's system prompt, built when the conversation starts
+SYSTEM_PREFIX_CACHE_SIZE = 10000  # Conversations remembered, least recently used dropped first
+SYSTEM_PROMPT_RULES = (
+    "Respond with empathy and helpful advice. Keep your responses brief and focused.\n"
+    "Ask at most one follow-up question per response. Prioritize clarity and conciseness."
+)
+_system_prefixes = collections.OrderedDict()  # conversation key -> system prompt
+_system_prefixes_lock = threading.Lock()
+
+def shared_system_prefix(major):
+    """System prefix for replies that may be cached and shown to other students: no name or history."""
+    return f"You are a mental health assistant for students. The user is studying {major}.\n\n{SYSTEM_PROMPT_RULES}"
+
+def system_prefix(key, profile, history):
+    """
+    The system message every turn of a conversation starts with. The profile
+    fields it shows are read once, on the conversation's first turn, and the
+    text is kept for the rest of it, so providers that cache prompt prefixes
+    can reuse it (and the turns after it) from one message to the next.
+    """
+    with _system_prefixes_lock:
+        content = _system_prefixes.get(key) if len(history) else None
+        if content is not None:
+            _system_prefixes.move_to_end(key)
+            return content
+    content = (
+        f"You are a mental health assistant for students. The user is studying {profile.get('major', 'student')}.\n"
+        f"- Name: {key[0]}\n"
+        f"- Last emotion: {profile.get('last_emotion', 'None')}\n"
+        f"- Last conversation: {profile.get('last_conversation', 'None')}\n\n"
+        f"{SYSTEM_PROMPT_RULES}"
+    )
+    with _system_prefixes_lock:
+        _system_prefixes[key] = content
+        _system_prefixes.move_to_end(key)
+        while len(_system_prefixes) > SYSTEM_PREFIX_CACHE_SIZE:
+            _system_prefixes.popitem(last=False)
+    return content
+
+def turn_instructions(context):
+    """System notes that only apply to this message (reminders, deadlines, resources, passages)."""
+    notes = []
+    if "reminder" in context:
+        notes.append(f"- Scheduled reminder: {context['reminder']}\nShare this reminder with the user.")
+    if "deadline_info" in context:
+        notes.append(f"- Upcoming deadlines: {context['deadline_info']}\nInclude these deadlines in your response.")
+    if "resource_info" in context:
+        notes.append(f"- Mental health resources: {context['resource_info']}\nIf resources are provided, include them in your response to support the user.")
+    if "passages" in context:
+        passages = "\n".join(f"  * {passage}" for passage in context["passages"])
+        notes.append(f"- Relevant knowledge base passages:\n{passages}\nUse these passages to ground your advice when they are relevant.")
+    return "\n".join(notes)
+
+@metrics.span("prompt_build")
+def build_messages(user_message, history, user_id, context=None, shared=False):
+    """
+    Build the chat messages for the LLM as (role, content) pairs: the cached
+    system prefix, a summary of folded turns, prior turns, this turn's notes
+    and the new message. Only the last two differ between consecutive turns,
+    except when another chunk of turns is folded. `context` comes from
+    gather_context and is gathered on the spot when not supplied. `shared`
+    swaps in the prefix without the student's name or history, for replies
+    that go into the response cache.
+    """
+    if context is None:
+        context = gather_context(user_message, user_id)
+    key = conversation_key(user_id, history)
+    # Only recent turns go in verbatim; older ones arrive as a running summary
+    summary, recent_turns = _conversation_context.window(key, history)
+
+    if shared:
+        prefix = shared_system_prefix(context["profile"].get("major", "student"))
+    else:
+        prefix = system_prefix(key, context["profile"], history)
+    messages = [("system", prefix)]
+    if summary:
+        messages.append(("system", f"Summary of earlier turns in this conversation: {summary}"))
+    for user_text, bot_text in recent_turns:
+        messages.append(("user", user_text))
+        messages.append(("assistant", bot_text))
+    instructions = turn_instructions(context)
+    if instructions:
+        messages.append(("system", instructions))
+    messages.append(("user", user_message))
+
+    prompt_chars = sum(len(content) for _, content in messages)
+    metrics.observe("chatbot_prompt_chars", prompt_chars, buckets=SIZE_BUCKETS)
+    metrics.inc("chatbot_prompt_chars_total", prompt_chars)
+    return messages
+
+@metrics.span("ui_history")
+def format_ui_history(history):
     # Format history for Gradio UI
+    if isinstance(history, Session):
+        return history.ui_history  # Kept up to date turn by turn
     ui_history = []
     for pair in history:
         ui_history.append({"role": "user", "content": pair[0]})
         ui_history.append({"role": "assistant", "content": pair[1]})
+    return ui_history
+
+def start_ui_turn(history, user_message):
+    """UI history plus the new message and an empty reply for streaming into."""
+    if isinstance(history, Session):
+        return history.start_turn(user_message)
+    ui_history = format_ui_history(history)
+    ui_history.append({"role": "user", "content": user_message})
+    ui_history.append({"role": "assistant", "content": ""})
+    return ui_history
+
+def reply_cache_key(user_message, history, context):
+    """
+    Cache key for a chat reply, or None when the reply must not be cached.
+    Only a conversation's opening message is cached, and only when the
+    prompt carries nothing time-sensitive (deadlines, reminders); such turns
+    are built with the shared system prefix, so the reply depends only on
+    the fields in the key and can be reused for any student who matches.
+    """
+    if _response_cache is None or len(history) or "deadline_info" in context or "reminder" in context:
+        return None
+    return make_cache_key(
+        "reply",
+        normalize_message(user_message),
+        context["profile"].get("major", "student"),
+        context["sentiment"],
+        context.get("resource_info", ""),
+        *context.get("passages", []),
+    )
 
-    return ui_history, history
-
-# ----------------------------
-# Gradio Blocks UI Definition
-# -----------------------------
-
-def setup_profile(name, major_val, year, stressors, univ):
-    """
-    Save the profile to our JSON file and update the user_id state.
-    """
-    if not name.strip():
-        return "Please enter a valid name.", ""  # Validate non-empty name
-    update_user_data(name, "name", name)
-    update_student_profile(name, major_val, year, stressors, univ)
-    status = f"Profile set up for {name}. Welcome!"
-    return status, name  # Return status and user_id
-
-def main():
-    with gr.Blocks() as demo:
-        gr.Markdown("# Mental Health Chatbot")
-
-        with gr.Tab("User Setup"):
-            gr.Markdown("### Set up your profile")
-            user_name = gr.Textbox(label="Enter your name")
-            major = gr.Textbox(label="Your major")
-            year_of_study = gr.Textbox(label="Year of Study")
-            common_stressors = gr.Textbox(label="Common stressors")
-            university = gr.Textbox(label="University")
-            setup_button = gr.Button("Set Up Profile")
-            setup_output = gr.Textbox(label="Setup Status", interactive=False)
-
-        with gr.Tab("Chat"):
-            gr.Markdown("### Chat with the Bot")
-            chatbot = gr.Chatbot(label="Conversation", type="messages")
-            msg = gr.Textbox(label="Your Message")
-            clear = gr.Button("Clear Chat")
-
-        state = gr.State([])  # Stores internal conversation history
-        user_id_state = gr.State("")  # Tracks current user ID
-
-        setup_button.click(
-            setup_profile,
-            inputs=[user_name, major, year_of_study, common_stressors, university],
-            outputs=[setup_output, user_id_state]
-        )
-
-        def respond(message, chat_history, user_id):
-            return chatbot_response(message, chat_history, user_id)
+def chatbot_response(user_message, history, user_id):
+    """
+    This function takes the latest user message, the conversation history,
+    and the user_id. It sends the conversation to the LLM as (role, content)
+    messages (see build_messages), updates the internal history, and returns
+    the UI history in the expected format.
+    """
+    with metrics.turn(user_id=user_id, mode="sync"):
+        context = gather_context(user_message, user_id)
+        try:
+            cache_key = reply_cache_key(user_message, history, context)
+            bot_reply = lookup_cached_reply(cache_key)
+            if bot_reply is None:
+                messages = build_messages(user_message, history, user_id, context, shared=cache_key is not None)
+                llm = get_llm()
+                with metrics.span("llm_call"):
+                    response = get_llm_dispatcher().call(lambda: llm.invoke(messages), turn_priority(context))
+                record_llm_usage(response)
+                bot_reply = response.content.strip()
+                if cache_key:
+                    _response_cache.set(cache_key, bot_reply)
+        except LLMUnavailable as error:
+            bot_reply = degraded_reply(user_id, context, error)
+
+        history.append((user_message, bot_reply))
+        record_turn_emotion(user_id, history, context["sentiment"])
+
+        return format_ui_history(history), history
+
+def chatbot_response_stream(user_message, history, user_id):
+    """
+    Streaming version of chatbot_response. Yields (ui_history, history) each
+    time new tokens arrive so the UI can render the partial reply; `history`
+    only gains the new turn in the final yield, once the reply is complete.
+    """
+    with metrics.turn(user_id=user_id, mode="stream") as turn:
+        context = gather_context(user_message, user_id)
+        ui_history = start_ui_turn(history, user_message)
+
+        try:
+            cache_key = reply_cache_key(user_message, history, context)
+            bot_reply = lookup_cached_reply(cache_key)
+            if bot_reply is None:
+                messages = build_messages(user_message, history, user_id, context, shared=cache_key is not None)
+                llm = get_llm()
+                partial_reply = ""
+                started = time.perf_counter()
+                for chunk in get_llm_dispatcher().stream(lambda: llm.stream(messages), turn_priority(context)):
+                    record_llm_usage(chunk)
+                    if not chunk.content:
+                        continue  # Providers may send empty keep-alive/metadata chunks
+                    if not partial_reply:
+                        metrics.observe("chatbot_time_to_first_token_seconds", time.perf_counter() - started)
+                    partial_reply += chunk.content
+                    ui_history[-1]["content"] = partial_reply
+                    yield ui_history, history
+                turn.add_stage("llm_call", time.perf_counter() - started)
+                bot_reply = partial_reply.strip()
+                if cache_key:
+                    _response_cache.set(cache_key, bot_reply)
+        except LLMUnavailable as error:
+            bot_reply = degraded_reply(user_id, context, error)
+
+        ui_history[-1]["content"] = bot_reply
+        history.append((user_message, bot_reply))
+        record_turn_emotion(user_id, history, context["sentiment"])
+    yield ui_history, history
+
+async def chatbot_response_async(user_message, history, user_id):
+    """
+    Async version of chatbot_response: context lookups run concurrently and the
+    model is awaited through its async API, so no thread is held per request.
+    """
+    with metrics.turn(user_id=user_id, mode="async"):
+        context = await gather_context_async(user_message, user_id)
+
+        try:
+            cache_key = reply_cache_key(user_message, history, context)
+            bot_reply = lookup_cached_reply(cache_key)
+            if bot_reply is None:
+                # May summarize older turns with a blocking LLM call, so keep it off the event loop
+                messages = await asyncio.to_thread(build_messages, user_message, history, user_id, context, cache_key is not None)
+                llm = get_llm()
+                with metrics.span("llm_call"):
+                    response = await get_llm_dispatcher().acall(lambda: llm.ainvoke(messages), turn_priority(context))
+                record_llm_usage(response)
+                bot_reply = response.content.strip()
+                if cache_key:
+                    _response_cache.set(cache_key, bot_reply)
+        except LLMUnavailable as error:
+            bot_reply = await asyncio.to_thread(degraded_reply, user_id, context, error)
+
+        history.append((user_message, bot_reply))
+        record_turn_emotion(user_id, history, context["sentiment"])
+        ui_history = format_ui_history(history)
+        return ui_history, history
+
+async def chatbot_response_astream(user_message, history, user_id):
+    """
+    Async streaming version: yields (ui_history, history) like
+    chatbot_response_stream, using the async context gathering and astream.
+    """
+    with metrics.turn(user_id=user_id, mode="astream") as turn:
+        context = await gather_context_async(user_message, user_id)
+        ui_history = start_ui_turn(history, user_message)
+
+        try:
+            cache_key = reply_cache_key(user_message, history, context)
+            bot_reply = lookup_cached_reply(cache_key)
+            if bot_reply is None:
+                # May summarize older turns with a blocking LLM call, so keep it off the event loop
+                messages = await asyncio.to_thread(build_messages, user_message, history, user_id, context, cache_key is not None)
+                llm = get_llm()
+                partial_reply = ""
+                started = time.perf_counter()
+                async for chunk in get_llm_dispatcher().astream(lambda: llm.astream(messages), turn_priority(context)):
+                    record_llm_usage(chunk)
+                    if not chunk.content:
+                        continue
+                    if not partial_reply:
+                        metrics.observe("chatbot_time_to_first_token_seconds", time.perf_counter() - started)
+                    partial_reply += chunk.content
+                    ui_history[-1]["content"] = partial_reply
+                    yield ui_history, history
+                turn.add_stage("llm_call", time.perf_counter() - started)
+                bot_reply = partial_reply.strip()
+                if cache_key:
+                    _response_cache.set(cache_key, bot_reply)
+        except LLMUnavailable as error:
+            bot_reply = await asyncio.to_thread(degraded_reply, user_id, context, error)
+
+        ui_history[-1]["content"] = bot_reply
+        history.append((user_message, bot_reply))
+        record_turn_emotion(user_id, history, context["sentiment"])
+    yield ui_history, history
 
-        msg.submit(respond, [msg, state, user_id_state], [chatbot, state])
-        clear.click(lambda: ([], []), None, [chatbot, state])  # Reset both UI and internal history
+# -----------------------------------------
+# Server-Side Chat Sessions
+# -----------------------------------------
 
-    demo.launch(share=False)  # Disable share link for local usage
+def persist_session_summary(session):
+    """Queue a summary of an evicted session as the user's last_conversation, and its closing emotion."""
+    key = conversation_key(session.user_id, session)
+    summary, recent_turns = _conversation_context.window(key, session)
+    lines = [f"Earlier summary: {summary}"] if summary else []
+    lines += [f"User: {user}\nAssistant: {bot}" for user, bot in recent_turns]
+    _post_conversation.submit_session(session.user_id, lines)
+    if len(session):
+        _post_conversation.submit_fields(session.user_id, {"last_emotion": analyze_sentiment(session[-1].user)})
+    _conversation_context.forget(key)  # Only this session; the user's other sessions keep their state
+    with _system_prefixes_lock:
+        _system_prefixes.pop(key, None)
+
+def create_session_store():
+    options = dict(max_bytes=int(SESSION_MEMORY_BUDGET_MB * 1024 * 1024), ttl=SESSION_IDLE_TTL, on_evict=persist_session_summary)
+    if SHARED_STATE_DB:
+        return SqliteSessionStore(SHARED_STATE_DB, **options)  # Any worker can continue any session
+    return SessionStore(**options)
+
+_sessions = create_session_store()
+
+metrics.gauge(
+    "chatbot_sessions",
+    lambda: {(("kind", kind),): value for kind, value in _sessions.stats().items()},
+    "Open chat sessions, their estimated bytes, and evictions so far",
+)
+
+def get_session(session_id, user_id):
+    return _sessions.get(session_id, user_id)
+
+def end_session(session_id):
+    _sessions.discard(session_id)  # Summarized on the next sweep
+
+def start_session_sweeper():
+    if SESSION_SWEEP_INTERVAL > 0:
+        _sessions.start(SESSION_SWEEP_INTERVAL)
+
+async def session_response_astream(user_message, session_id, user_id):
+    """
+    chatbot_response_astream for a server-side session: the browser only holds
+    `session_id`, and the session's UI history grows in place each turn.
+    Yields (ui_history, session_id).
+    """
+    # The shared store runs write transactions (and may load evicted sessions), so keep it off the event loop
+    shared = isinstance(_sessions, SqliteSessionStore)
+    session = await asyncio.to_thread(get_session, session_id, user_id) if shared else get_session(session_id, user_id)
+    try:
+        async for ui_history, _ in chatbot_response_astream(user_message, session, user_id):
+            yield ui_history, session_id
+    finally:
+        session.cancel_turn()  # The turn raised or was abandoned before its reply was added
+        if shared:
+            await asyncio.to_thread(_sessions.touch, session)  # Count the new turn against the memory cap
+        else:
+            _sessions.touch(session)
 
 if __name__ == "__main__":
+    from chatbot_ui import main
     main()
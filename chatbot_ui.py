@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+import uuid
+from chatbot import (
+    update_user_data,
+    update_student_profile,
+    get_retriever,
+    get_resource_index,
+    retrieve_passages,
+    start_reminder_scheduler,
+    session_response_astream,
+    end_session,
+    start_session_sweeper,
+    start_post_conversation_worker,
+    metrics,
+    CHAT_CONCURRENCY_LIMIT,
+    CHAT_QUEUE_MAX_SIZE,
+    METRICS_PORT,
+    METRICS_HOST,
+    WORKER_ID,
+)
+from metrics import start_metrics_server
+
+# ----------------------------
+# Gradio Blocks UI Definition
+# -----------------------------
+
+def setup_profile(name, major_val, year, stressors, univ):
+    """
+    Save the profile to our JSON file and update the user_id state.
+    """
+    if not name.strip():
+        return "Please enter a valid name.", ""  # Validate non-empty name
+    update_user_data(name, "name", name)
+    update_student_profile(name, major_val, year, stressors, univ)
+    status = f"Profile set up for {name}. Welcome!"
+    return status, name  # Return status and user_id
+
+def main():
+    import gradio as gr  # Several seconds to import; only the app itself needs it
+
+    # Load the knowledge-base index and embedding model now rather than on the first chat turn
+    if get_retriever() is not None:
+        retrieve_passages("warm up")
+    get_resource_index()  # Build the institution index before the first chat turn
+    if WORKER_ID == 0:
+        start_reminder_scheduler()  # Once per deployment, or every worker would deliver each reminder
+    start_session_sweeper()
+    start_post_conversation_worker()
+    if METRICS_PORT:
+        start_metrics_server(metrics, METRICS_PORT, METRICS_HOST)  # Scrape http://METRICS_HOST:METRICS_PORT/metrics
+
+    with gr.Blocks() as demo:
+        gr.Markdown("# Mental Health Chatbot")
+
+        with gr.Tab("User Setup"):
+            gr.Markdown("### Set up your profile")
+            user_name = gr.Textbox(label="Enter your name")
+            major = gr.Textbox(label="Your major")
+            year_of_study = gr.Textbox(label="Year of Study")
+            common_stressors = gr.Textbox(label="Common stressors")
+            university = gr.Textbox(label="University")
+            setup_button = gr.Button("Set Up Profile")
+            setup_output = gr.Textbox(label="Setup Status", interactive=False)
+
+        with gr.Tab("Chat"):
+            gr.Markdown("### Chat with the Bot")
+            chatbot = gr.Chatbot(label="Conversation", type="messages")
+            msg = gr.Textbox(label="Your Message")
+            clear = gr.Button("Clear Chat")
+
+        session_state = gr.State("")  # Session id; the conversation itself is kept server-side
+        user_id_state = gr.State("")  # Tracks current user ID
+
+        setup_button.click(
+            setup_profile,
+            inputs=[user_name, major, year_of_study, common_stressors, university],
+            outputs=[setup_output, user_id_state]
+        )
+
+        async def respond(message, session_id, user_id):
+            # Stream partial replies into the chat window as tokens arrive
+            async for update in session_response_astream(message, session_id or uuid.uuid4().hex, user_id):
+                yield update
+
+        def clear_chat(session_id):
+            end_session(session_id)
+            return [], ""  # Reset the UI; the next message starts a new session
+
+        msg.submit(respond, [msg, session_state, user_id_state], [chatbot, session_state], concurrency_limit=CHAT_CONCURRENCY_LIMIT)
+        clear.click(clear_chat, session_state, [chatbot, session_state])
+
+    demo.queue(max_size=CHAT_QUEUE_MAX_SIZE)  # Requests beyond this are rejected instead of piling up
+    demo.launch(share=False)  # Disable share link for local usage
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+import threading
+from collections import OrderedDict
+
+# -----------------------------------------
+# Token-Budgeted Conversation Context
+# -----------------------------------------
+
+def estimate_tokens(text):
+    # Roughly 4 characters per token for English text; close enough for budgeting
+    return len(text) // 4 + 1
+
+
+class ConversationContext:
+    """
+    Keeps the prompt's view of a conversation bounded. Recent turns are sent
+    verbatim; older ones are folded into a running summary using
+    `summarize(lines)`. Folding happens in chunks: the verbatim window grows
+    to 2 * `max_turns` turns (or past `token_budget`) and is then cut back to
+    `max_turns` turns (or half the budget) with one summary call, so a long
+    conversation costs one extra LLM call every `max_turns` turns rather than
+    every turn, and the prompt only changes shape at those points. State is
+    kept per conversation key for at most `max_keys` conversations.
+    """
+
+    def __init__(self, summarize, max_turns=6, token_budget=1500, on_summary=None, max_keys=10000):
+        self._summarize = summarize
+        self._on_summary = on_summary  # Called as on_summary(key, summary) after each fold
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.max_keys = max_keys
+        self._folded = OrderedDict()  # key -> (first turn, folded turn count, summary), least recently used first
+        self._lock = threading.Lock()
+
+    def window(self, key, history):
+        """Return (summary or None, recent turns to send verbatim) for `history`."""
+        if not history:
+            return None, []
+        with self._lock:
+            first_turn, folded, summary = self._folded.get(key, (None, 0, None))
+            if key in self._folded:
+                self._folded.move_to_end(key)
+        if first_turn != tuple(history[0]) or folded > len(history):
+            folded, summary = 0, None  # Cleared chat or a different conversation
+
+        keep_from = folded
+        if len(history) - folded > 2 * self.max_turns:
+            keep_from = len(history) - self.max_turns
+        budget = self.token_budget - (estimate_tokens(summary) if summary else 0)
+        tokens = sum(estimate_tokens(user) + estimate_tokens(bot) for user, bot in history[keep_from:])
+        if tokens > budget:
+            # Over budget: drop the oldest verbatim turns down to half of it, so the
+            # next few turns fit without another fold (always keep the last one)
+            while tokens > budget // 2 and keep_from < len(history) - 1:
+                user, bot = history[keep_from]
+                tokens -= estimate_tokens(user) + estimate_tokens(bot)
+                keep_from += 1
+
+        if keep_from > folded:
+            lines = [f"Earlier summary: {summary}"] if summary else []
+            lines += [f"User: {user}\nAssistant: {bot}" for user, bot in history[folded:keep_from]]
+            summary = self._summarize(lines)
+            with self._lock:
+                self._folded[key] = (tuple(history[0]), keep_from, summary)
+                self._folded.move_to_end(key)
+                while len(self._folded) > self.max_keys:
+                    self._folded.popitem(last=False)  # A forgotten conversation is simply re-folded
+            if self._on_summary:
+                self._on_summary(key, summary)
+
+        return summary, history[keep_from:]
+
+    def forget(self, key):
+        with self._lock:
+            self._folded.pop(key, None)
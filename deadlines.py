@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+
+import heapq
+import bisect
+import logging
+import datetime
+import threading
+
+# -------------------------------
+# Deadline Index
+# -------------------------------
+
+class DeadlineIndex:
+    """
+    Pre-parsed deadlines for every user seen so far. Each user's deadlines are
+    kept as parallel lists sorted by date, so "what is due by X" is a bisect;
+    a global min-heap over all users lets the reminder scheduler pull only the
+    deadlines that have come due instead of scanning every profile.
+    """
+
+    def __init__(self):
+        self._users = {}  # user_id -> (raw deadlines dict, sorted dates, tasks in date order)
+        self._heap = []  # (date, user_id, task) for every deadline not yet reminded
+        self._scheduled = set()  # Heap contents, so re-indexing a user does not duplicate reminders
+        self._reminded = {}  # user_id -> {(date, task)} already popped, so re-indexing does not repeat them
+        self._lock = threading.Lock()
+
+    def upcoming(self, user_id, deadlines, cutoff):
+        """
+        Tasks due on or before `cutoff` (overdue ones included), soonest first.
+        `deadlines` is the profile's {task: ISO date} dict; it is only re-parsed
+        when it differs from the copy indexed last time.
+        """
+        entry = self._users.get(user_id)
+        if entry is None or entry[0] != deadlines:
+            entry = self.update(user_id, deadlines)
+        _, dates, tasks = entry
+        return tasks[:bisect.bisect_right(dates, cutoff)]
+
+    def update(self, user_id, deadlines):
+        pairs = sorted(_parse_deadlines(user_id, deadlines))
+        entry = (dict(deadlines), [date for date, _ in pairs], [task for _, task in pairs])
+        with self._lock:
+            if pairs:
+                self._users[user_id] = entry
+            else:
+                self._users.pop(user_id, None)  # Nothing to remind; do not hold an entry per user
+            # Forget reminders for deadlines that were removed or moved; keep the rest
+            reminded = self._reminded.get(user_id, set()) & set(pairs)
+            if reminded:
+                self._reminded[user_id] = reminded
+            else:
+                self._reminded.pop(user_id, None)
+            for date, task in pairs:
+                key = (date, user_id, task)
+                if key not in self._scheduled and (date, task) not in reminded:
+                    self._scheduled.add(key)
+                    heapq.heappush(self._heap, key)
+        return entry
+
+    def rebuild(self, deadlines_by_user):
+        """
+        Index every (user_id, deadlines dict) pair, e.g. one pass over the store
+        at startup. Deadlines already reminded about are not queued again.
+        """
+        with self._lock:
+            self._users.clear()
+            self._heap.clear()
+            self._scheduled.clear()
+            reminded, self._reminded = self._reminded, {}
+        for user_id, deadlines in deadlines_by_user:
+            if deadlines:
+                with self._lock:
+                    if user_id in reminded:
+                        self._reminded[user_id] = reminded[user_id]
+                self.update(user_id, deadlines)
+
+    def pop_due(self, cutoff):
+        """
+        Remove and return {user_id: [tasks]} for deadlines on or before `cutoff`.
+        Deadlines that were edited or deleted since they were queued are skipped.
+        """
+        due = {}
+        with self._lock:
+            while self._heap and self._heap[0][0] <= cutoff:
+                key = heapq.heappop(self._heap)
+                self._scheduled.discard(key)
+                date, user_id, task = key
+                entry = self._users.get(user_id)
+                if entry and entry[0].get(task) == date.isoformat():
+                    due.setdefault(user_id, []).append(task)
+                    self._reminded.setdefault(user_id, set()).add((date, task))
+        return due
+
+    def retry(self, user_id, tasks):
+        """Queue tasks returned by pop_due() again, e.g. after delivering their reminder failed."""
+        with self._lock:
+            entry = self._users.get(user_id)
+            reminded = self._reminded.get(user_id, set())
+            for task in tasks:
+                if entry and task in entry[0]:
+                    date = datetime.date.fromisoformat(entry[0][task])
+                    reminded.discard((date, task))
+                    key = (date, user_id, task)
+                    if key not in self._scheduled:
+                        self._scheduled.add(key)
+                        heapq.heappush(self._heap, key)
+
+    def clear(self):
+        self.rebuild([])
+        with self._lock:
+            self._reminded.clear()
+
+
+def _parse_deadlines(user_id, deadlines):
+    # One hand-edited date ("next friday") must not break the user's other deadlines, or the scheduler
+    for task, date in deadlines.items():
+        try:
+            yield datetime.date.fromisoformat(date), task
+        except (TypeError, ValueError):
+            logging.getLogger(__name__).warning("Skipping deadline %r for %s: bad date %r", task, user_id, date)
+
+
+# -------------------------------
+# Background Reminder Scheduler
+# -------------------------------
+
+class ReminderScheduler:
+    """
+    Daemon thread that wakes every `interval` seconds, pops the deadlines due
+    within `lead_days` from the index and hands each user's tasks to
+    `deliver(user_id, tasks)`. Each deadline is delivered once. `refresh()`,
+    if given, runs before every sweep to pull in deadlines written elsewhere
+    (e.g. by other worker processes or a roster import).
+    """
+
+    def __init__(self, index, deliver, interval=3600, lead_days=3, refresh=None):
+        self.index = index
+        self.deliver = deliver
+        self.refresh = refresh
+        self.interval = interval
+        self.lead_days = lead_days
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self, today=None):
+        today = today or datetime.date.today()
+        if self.refresh is not None:
+            self.refresh()
+        due = self.index.pop_due(today + datetime.timedelta(days=self.lead_days))
+        for user_id, tasks in due.items():
+            try:
+                self.deliver(user_id, tasks)
+            except Exception:
+                logging.getLogger(__name__).exception("Delivering reminders to %s failed", user_id)
+                self.index.retry(user_id, tasks)  # Next sweep tries again
+        return due
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="reminder-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                logging.getLogger(__name__).exception("Reminder sweep failed")  # Retried next interval
+            self._stop.wait(self.interval)
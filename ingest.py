@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+
+# Usage: python ingest.py [--data-dir data] [--chroma-dir chroma_db] [--workers 4] [--force]
+
+import os
+import sys
+import json
+import glob
+import hashlib
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from pypdf import PdfReader
+import chromadb
+from retrieval import EMBEDDING_MODEL, EMBEDDINGS_FILE, write_vector_index
+
+# -------------------------------
+# Knowledge Base Ingestion Settings
+# -------------------------------
+
+DATA_DIR = "data"
+CHROMA_DIR = "chroma_db"
+COLLECTION_NAME = "langchain"  # Collection name LangChain's Chroma wrapper created in chroma_db
+MANIFEST_NAME = "ingest_manifest.json"  # Per-file content hashes, kept next to the Chroma store
+CHUNK_SIZE = 1000  # Characters per chunk
+CHUNK_OVERLAP = 200  # Characters shared by neighbouring chunks so sentences are not cut off
+EMBED_BATCH_SIZE = 64  # Chunks per embedding task sent to the process pool
+EXPORT_PAGE_SIZE = 1000  # Rows read from Chroma at a time when exporting the vector index
+
+# -------------------------------
+# Change Detection
+# -------------------------------
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load_manifest(chroma_dir):
+    path = os.path.join(chroma_dir, MANIFEST_NAME)
+    if os.path.exists(path):
+        with open(path, "r") as file:
+            return json.load(file)
+    return {}
+
+def save_manifest(chroma_dir, manifest):
+    path = os.path.join(chroma_dir, MANIFEST_NAME)
+    with open(f"{path}.tmp", "w") as file:
+        json.dump(manifest, file, indent=4)
+    os.replace(f"{path}.tmp", path)
+
+def plan_ingest(pdf_hashes, manifest, force=False):
+    """
+    Compare current file hashes with the manifest and return
+    (changed sources to (re-)embed, sources whose files were removed).
+    """
+    changed = [source for source, digest in pdf_hashes.items() if force or manifest.get(source) != digest]
+    removed = [source for source in manifest if source not in pdf_hashes]
+    return changed, removed
+
+# -------------------------------
+# Streaming & Chunking
+# -------------------------------
+
+def chunk_text(text, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    text = " ".join(text.split())  # PDF extraction leaves ragged whitespace
+    if not text:
+        return []
+    step = size - overlap
+    return [text[start:start + size] for start in range(0, max(len(text) - overlap, 1), step)]
+
+def iter_chunks(path, source, digest):
+    """Yield (id, text, metadata) for each chunk, reading the PDF one page at a time."""
+    reader = PdfReader(path)
+    for page_number, page in enumerate(reader.pages):
+        for index, chunk in enumerate(chunk_text(page.extract_text() or "")):
+            chunk_id = f"{digest[:16]}-{page_number}-{index}"
+            yield chunk_id, chunk, {"source": source, "page": page_number}
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+# -------------------------------
+# Embedding Workers
+# -------------------------------
+
+_worker_model = None
+
+def _init_worker(model_name):
+    # Imported here so only the pool workers pay for loading torch and the model
+    global _worker_model
+    from sentence_transformers import SentenceTransformer
+    _worker_model = SentenceTransformer(model_name)
+
+def _embed_batch(texts):
+    return _worker_model.encode(texts, batch_size=len(texts), normalize_embeddings=True).tolist()
+
+def embed_batches(pool, batches, workers):
+    """
+    Run batches through the pool while keeping only a few in flight, so a
+    large PDF never has to be held in memory all at once.
+    """
+    in_flight = []
+    for batch in batches:
+        in_flight.append((batch, pool.submit(_embed_batch, [text for _, text, _ in batch])))
+        if len(in_flight) >= workers * 2:
+            batch, future = in_flight.pop(0)
+            yield batch, future.result()
+    for batch, future in in_flight:
+        yield batch, future.result()
+
+def export_index(collection, chroma_dir):
+    """Dump the collection to the memory-mapped index the chatbot searches (see retrieval.py)."""
+    count = collection.count()
+
+    def rows():
+        for offset in range(0, count, EXPORT_PAGE_SIZE):
+            page = collection.get(limit=EXPORT_PAGE_SIZE, offset=offset, include=["embeddings", "documents", "metadatas"])
+            yield from zip(page["embeddings"], page["documents"], page["metadatas"])
+
+    write_vector_index(chroma_dir, rows(), count)
+    print(f"Exported {count} chunks to the retrieval index")
+
+# -------------------------------
+# Ingestion Command
+# -------------------------------
+
+def ingest(data_dir=DATA_DIR, chroma_dir=CHROMA_DIR, workers=None, batch_size=EMBED_BATCH_SIZE, force=False):
+    """
+    Embed new or changed PDFs from `data_dir` into the Chroma collection and
+    drop chunks of PDFs that were deleted. Unchanged files are skipped.
+    Returns (changed sources, removed sources).
+    """
+    workers = workers or max(1, (os.cpu_count() or 2) // 2)
+    pdf_paths = {os.path.relpath(path, data_dir): path for path in sorted(glob.glob(os.path.join(data_dir, "**", "*.pdf"), recursive=True))}
+    pdf_hashes = {source: file_hash(path) for source, path in pdf_paths.items()}
+    manifest = load_manifest(chroma_dir)
+    changed, removed = plan_ingest(pdf_hashes, manifest, force)
+
+    client = chromadb.PersistentClient(path=chroma_dir)
+    collection = client.get_or_create_collection(COLLECTION_NAME, embedding_function=None)
+
+    for source in removed:
+        collection.delete(where={"source": source})
+        del manifest[source]
+        print(f"Removed {source}")
+
+    if changed:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(EMBEDDING_MODEL,)) as pool:
+            for source in changed:
+                collection.delete(where={"source": source})  # Old chunks of a changed file
+                chunks = iter_chunks(pdf_paths[source], source, pdf_hashes[source])
+                count = 0
+                for batch, embeddings in embed_batches(pool, batched(chunks, batch_size), workers):
+                    collection.upsert(
+                        ids=[chunk_id for chunk_id, _, _ in batch],
+                        documents=[text for _, text, _ in batch],
+                        metadatas=[metadata for _, _, metadata in batch],
+                        embeddings=embeddings,
+                    )
+                    count += len(batch)
+                # Record the hash only once the file is fully written, so an interrupted run redoes it
+                manifest[source] = pdf_hashes[source]
+                save_manifest(chroma_dir, manifest)
+                print(f"Embedded {source}: {count} chunks")
+    elif removed:
+        save_manifest(chroma_dir, manifest)
+
+    if changed or removed or not os.path.exists(os.path.join(chroma_dir, EMBEDDINGS_FILE)):
+        export_index(collection, chroma_dir)
+
+    skipped = len(pdf_hashes) - len(changed)
+    print(f"Done. {len(changed)} embedded, {skipped} unchanged, {len(removed)} removed.")
+    return changed, removed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Embed the PDFs in data/ into the chatbot's Chroma knowledge base.")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--chroma-dir", default=CHROMA_DIR)
+    parser.add_argument("--workers", type=int, default=None, help="Embedding processes (default: half the CPUs)")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE)
+    parser.add_argument("--force", action="store_true", help="Re-embed every PDF even if unchanged")
+    args = parser.parse_args(argv)
+    ingest(args.data_dir, args.chroma_dir, args.workers, args.batch_size, args.force)
+
+if __name__ == "__main__":
+    sys.exit(main())
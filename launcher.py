@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+
+# Usage:
+#   python launcher.py --workers 4 [--host 0.0.0.0] [--port 7860]
+#
+# Starts N copies of the Gradio app (chatbot_ui.py) on local ports and serves
+# them all on one port. Workers share profiles, sessions, cached replies and
+# the LLM rate limit through SQLite files, so any worker can serve any user.
+
+import os
+import sys
+import zlib
+import signal
+import asyncio
+import argparse
+import subprocess
+from llm_client import LLMConfig
+from chatbot import PROFILE_STORE_BACKEND, RESPONSE_CACHE_MODE, METRICS_PORT
+
+# -------------------------------
+# Worker Processes
+# -------------------------------
+
+SHARED_STATE_FILE = "shared_state.sqlite3"
+PROXY_CHUNK_BYTES = 64 * 1024
+RESTART_DELAY_SECONDS = 2.0  # Pause before restarting a worker that exited
+
+
+def worker_env(index, workers, worker_port, shared_db, base_env=None):
+    """Environment for worker `index` of `workers`: its own ports, shared state for everything else."""
+    env = dict(os.environ if base_env is None else base_env)
+    env.update(
+        CHATBOT_WORKER_ID=str(index),
+        GRADIO_SERVER_NAME="127.0.0.1",  # Only reachable through the proxy
+        GRADIO_SERVER_PORT=str(worker_port),
+        SHARED_STATE_DB=shared_db,
+        PROFILE_STORE_BACKEND="sqlite",  # The JSON file has no cross-process locking
+    )
+    if env.get("RESPONSE_CACHE", RESPONSE_CACHE_MODE) == "memory":
+        env["RESPONSE_CACHE"] = "disk"  # The SQLite tier is what workers share
+    metrics_port = int(env.get("METRICS_PORT", METRICS_PORT))
+    env["METRICS_PORT"] = str(metrics_port + index if metrics_port else 0)
+    # Split the provider concurrency budget so N workers together stay within it
+    total = int(env.get("LLM_MAX_CONCURRENCY", LLMConfig.max_concurrency))
+    env["LLM_MAX_CONCURRENCY"] = str(max(1, total // workers))
+    return env
+
+
+class WorkerPool:
+    """Runs the app processes and restarts any that exit until stop() is called."""
+
+    def __init__(self, workers, base_port, shared_db, command=None):
+        self.ports = [base_port + index for index in range(workers)]
+        self.shared_db = shared_db
+        self.command = command or [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "chatbot_ui.py")]
+        self._processes = [None] * workers
+        self._stopping = False
+
+    def start(self):
+        for index in range(len(self.ports)):
+            self._spawn(index)
+
+    def _spawn(self, index):
+        env = worker_env(index, len(self.ports), self.ports[index], self.shared_db)
+        self._processes[index] = subprocess.Popen(self.command, env=env)
+
+    async def supervise(self):
+        while not self._stopping:
+            await asyncio.sleep(RESTART_DELAY_SECONDS)
+            for index, process in enumerate(self._processes):
+                if not self._stopping and process.poll() is not None:
+                    print(f"Worker {index} exited with {process.returncode}; restarting.", file=sys.stderr)
+                    self._spawn(index)
+
+    def stop(self, timeout=10):
+        self._stopping = True
+        for process in self._processes:
+            if process is not None and process.poll() is None:
+                process.terminate()
+        for process in self._processes:
+            if process is not None:
+                try:
+                    process.wait(timeout)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+# -------------------------------
+# Sticky TCP Proxy
+# -------------------------------
+
+class StickyProxy:
+    """
+    Forwards each client connection to one of the workers, chosen by a hash
+    of the client's IP. Gradio keeps a browser's queue and event stream in
+    the process that accepted it, so every connection from one browser must
+    reach the same worker; if that worker is down the next one in order is
+    used instead (the conversation itself is in the shared session store).
+    """
+
+    def __init__(self, backends):
+        self.backends = backends  # [(host, port), ...]
+
+    def order(self, client_ip):
+        start = zlib.crc32(client_ip.encode("utf-8")) % len(self.backends)
+        return self.backends[start:] + self.backends[:start]
+
+    async def handle(self, client_reader, client_writer):
+        peer = client_writer.get_extra_info("peername")
+        client_ip = peer[0] if peer else ""
+        for host, port in self.order(client_ip):
+            try:
+                upstream_reader, upstream_writer = await asyncio.open_connection(host, port)
+                break
+            except OSError:
+                continue  # Worker starting up or restarting
+        else:
+            client_writer.close()
+            return
+        await asyncio.gather(_pipe(client_reader, upstream_writer), _pipe(upstream_reader, client_writer))
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+async def _pipe(reader, writer):
+    try:
+        while True:
+            data = await reader.read(PROXY_CHUNK_BYTES)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+        if writer.can_write_eof():
+            writer.write_eof()  # Half-close so the other side sees the end of the request/response
+    except (ConnectionError, OSError):
+        writer.close()  # Tears down the other direction too
+
+
+async def run(args):
+    pool = WorkerPool(args.workers, args.worker_base_port or args.port + 1, args.shared_db)
+    proxy = StickyProxy([("127.0.0.1", port) for port in pool.ports])
+    loop = asyncio.get_running_loop()
+    stopped = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopped.set)
+
+    pool.start()
+    tasks = [asyncio.create_task(proxy.serve(args.host, args.port)), asyncio.create_task(pool.supervise())]
+    print(f"Serving {args.workers} workers on http://{args.host}:{args.port}", file=sys.stderr)
+    try:
+        await stopped.wait()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.to_thread(pool.stop)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run several chatbot worker processes behind one port.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("GRADIO_SERVER_PORT", 7860)))
+    parser.add_argument("--worker-base-port", type=int, default=0, help="First worker port (default: --port + 1)")
+    parser.add_argument("--shared-db", default=os.environ.get("SHARED_STATE_DB") or SHARED_STATE_FILE,
+                        help="SQLite file for the state workers share (sessions, rate limit)")
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if PROFILE_STORE_BACKEND != "sqlite":
+        print("Using the sqlite profile store; user_data.json is imported on first start.", file=sys.stderr)
+    asyncio.run(run(args))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import asyncio
+import threading
+from dataclasses import dataclass, field
+
+# -------------------------------
+# LLM Configuration & Client Pool
+# -------------------------------
+
+DEFAULT_MODEL_NAME = "llama-3.3-70b-versatile"
+DEFAULT_TEMPERATURE = 0.6  # Balances creativity and coherence
+DEFAULT_MAX_CONCURRENCY = 8
+
+
+@dataclass(frozen=True)
+class LLMConfig:
+    """Everything needed to build a client; frozen so it can key the registry."""
+    backend: str = "groq"
+    model_name: str = DEFAULT_MODEL_NAME
+    temperature: float = DEFAULT_TEMPERATURE
+    api_key: str = field(default="", repr=False)  # From GROQ_API_KEY; never printed
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY
+    stub_latency: float = 0.0  # Seconds the stub backend sleeps per call
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            backend=os.environ.get("LLM_BACKEND", "groq"),
+            model_name=os.environ.get("GROQ_MODEL_NAME", DEFAULT_MODEL_NAME),
+            temperature=float(os.environ.get("GROQ_TEMPERATURE", DEFAULT_TEMPERATURE)),
+            api_key=os.environ.get("GROQ_API_KEY", ""),
+            max_concurrency=int(os.environ.get("LLM_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)),
+            stub_latency=float(os.environ.get("LLM_STUB_LATENCY", 0.0)),
+        )
+
+
+class LLMClientRegistry:
+    """
+    Process-wide cache of LLM clients, one per distinct config. Reusing the
+    client keeps its HTTP connection pool (and TLS sessions) alive between
+    turns. Concurrency is capped by the LLMDispatcher, not here.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory  # Called as factory(config) on first use of a config
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def get(self, config):
+        client = self._clients.get(config)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(config)
+                if client is None:
+                    client = self._factory(config)
+                    self._clients[config] = client
+        return client
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+
+
+# -------------------------------
+# Pluggable Backends
+# -------------------------------
+
+_BACKENDS = {}
+
+def register_llm_backend(name, factory):
+    """Make `LLM_BACKEND=<name>` build clients with factory(config)."""
+    _BACKENDS[name] = factory
+
+def create_llm_backend(config):
+    if config.backend not in _BACKENDS:
+        raise ValueError(f"Unknown LLM backend: {config.backend}")
+    return _BACKENDS[config.backend](config)
+
+
+class StubMessage:
+    """Mimics the `.content` attribute of LangChain message objects."""
+
+    def __init__(self, content):
+        self.content = content
+
+    def __repr__(self):
+        return f"StubMessage({self.content!r})"
+
+
+class StubLLM:
+    """
+    Offline stand-in for ChatGroq with the same invoke/stream/ainvoke/astream
+    surface. Sleeps `latency` seconds per call so load tests can model a slow
+    provider without network access.
+    """
+
+    DEFAULT_REPLY = "Thanks for sharing that with me. What feels most stressful right now?"
+
+    def __init__(self, latency=0.0, reply=None):
+        self.latency = latency
+        self.reply = reply or self.DEFAULT_REPLY
+
+    def invoke(self, prompt):
+        if self.latency:
+            time.sleep(self.latency)
+        return StubMessage(self.reply)
+
+    def stream(self, prompt):
+        if self.latency:
+            time.sleep(self.latency)
+        for word in self.reply.split(" "):
+            yield StubMessage(word + " ")
+
+    async def ainvoke(self, prompt):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return StubMessage(self.reply)
+
+    async def astream(self, prompt):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        for word in self.reply.split(" "):
+            yield StubMessage(word + " ")
+
+
+register_llm_backend("stub", lambda config: StubLLM(latency=config.stub_latency))
@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+
+import time
+import heapq
+import random
+import sqlite3
+import asyncio
+import itertools
+import threading
+import contextlib
+
+# -------------------------------
+# LLM Admission Control
+# -------------------------------
+
+# Lower numbers are served first
+PRIORITY_DISTRESS = 0  # Sad/frustrated students, or turns that pulled wellness resources
+PRIORITY_NORMAL = 1
+PRIORITY_BACKGROUND = 2  # Summaries that nobody is waiting on
+
+# Provider errors worth retrying when they carry no HTTP status (class names, so no SDK import is needed)
+RETRYABLE_ERRORS = {"RateLimitError", "APIConnectionError", "APITimeoutError", "InternalServerError", "TimeoutError", "ConnectionError"}
+
+
+class LLMUnavailable(Exception):
+    """No LLM reply this turn: the queue is full or timed out, or retries ran out."""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason  # "saturated", "queue_timeout" or "retries_exhausted"
+
+
+class TokenBucket:
+    """
+    Requests-per-second limiter. reserve() takes a token, going into debt if
+    none are left, and returns how long the caller must wait before using it,
+    so sync and async callers can both sleep their own way.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate  # Tokens per second; 0 disables limiting
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+
+class SqliteTokenBucket(TokenBucket):
+    """
+    TokenBucket whose state lives in a SQLite file, so several app processes
+    share one provider rate limit. Each reserve() is one short write
+    transaction.
+    """
+
+    def __init__(self, path, rate, burst=1, name="llm"):
+        super().__init__(rate, burst)
+        self.path = path
+        self.name = name
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS token_buckets (name TEXT PRIMARY KEY, tokens REAL, updated REAL)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def reserve(self):
+        if not self.rate:
+            return 0.0
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()  # Wall-clock time, comparable between processes
+            row = conn.execute("SELECT tokens, updated FROM token_buckets WHERE name = ?", (self.name,)).fetchone()
+            tokens, updated = row if row else (self.burst, now)
+            tokens = min(self.burst, tokens + max(0.0, now - updated) * self.rate) - 1
+            conn.execute("INSERT OR REPLACE INTO token_buckets VALUES (?, ?, ?)", (self.name, tokens, now))
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return max(0.0, -tokens / self.rate)
+
+
+def is_retryable(error):
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return type(error).__name__ in RETRYABLE_ERRORS
+
+def retry_after(error):
+    """Seconds from a Retry-After header on the provider's response, if any."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after", 0))
+    except (TypeError, ValueError, AttributeError):
+        return 0.0
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "wake", "state")
+
+    def __init__(self, priority, seq, wake):
+        self.priority = priority
+        self.seq = seq
+        self.wake = wake  # Called (under the dispatcher lock) once state leaves "waiting"
+        self.state = "waiting"  # -> "granted", "rejected" or "abandoned"
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class LLMDispatcher:
+    """
+    Admission control in front of the LLM provider:
+      - at most `max_concurrency` calls in flight; later ones wait in a
+        priority queue of at most `max_queue` turns, distress first;
+      - a full queue turns away its lowest-priority waiter (or the newcomer)
+        with LLMUnavailable, so callers can answer with a degraded reply
+        immediately instead of piling up;
+      - every attempt takes a token from a shared rate limiter, and rate
+        limit / server / connection errors are retried with jittered
+        exponential backoff (honouring Retry-After).
+    """
+
+    def __init__(self, max_concurrency=8, max_queue=64, queue_timeout=20.0, rate=0.0, burst=1,
+                 max_retries=3, base_delay=0.5, max_delay=8.0, bucket=None):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.bucket = bucket or TokenBucket(rate, burst)  # e.g. a SqliteTokenBucket shared by workers
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._in_flight = 0
+        self._waiters = []  # Heap of _Waiter; abandoned entries are skipped lazily
+        self._queued = 0  # Waiters still in "waiting" state
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def stats(self):
+        with self._lock:
+            return {"in_flight": self._in_flight, "queued": self._queued}
+
+    # --- Admission ---
+
+    def _enter(self, priority, wake):
+        """Take a slot (returns None) or join the queue (returns the waiter)."""
+        with self._lock:
+            if self._in_flight < self.max_concurrency and not self._queued:
+                self._in_flight += 1
+                return None
+            if self._queued >= self.max_queue:
+                worst = max((waiter for waiter in self._waiters if waiter.state == "waiting"), default=None)
+                if worst is None or worst.priority <= priority:
+                    raise LLMUnavailable("saturated")
+                worst.state = "rejected"  # Make room for a more urgent turn
+                self._queued -= 1
+                worst.wake()
+            waiter = _Waiter(priority, next(self._seq), wake)
+            heapq.heappush(self._waiters, waiter)
+            self._queued += 1
+            return waiter
+
+    def _abandon(self, waiter):
+        """Leave the queue after a timeout or cancellation; returns True if a slot was granted meanwhile."""
+        with self._lock:
+            if waiter.state == "waiting":
+                waiter.state = "abandoned"
+                self._queued -= 1
+                return False
+            return waiter.state == "granted"
+
+    def _release(self):
+        with self._lock:
+            while self._waiters:
+                waiter = heapq.heappop(self._waiters)
+                if waiter.state == "waiting":
+                    waiter.state = "granted"  # The slot passes straight to the next turn
+                    self._queued -= 1
+                    waiter.wake()
+                    return
+            self._in_flight -= 1
+
+    @contextlib.contextmanager
+    def admit(self, priority=PRIORITY_NORMAL):
+        """Hold one of the concurrency slots, waiting in priority order for it."""
+        event = threading.Event()
+        waiter = self._enter(priority, event.set)
+        if waiter is not None:
+            if not event.wait(self.queue_timeout) and not self._abandon(waiter):
+                raise LLMUnavailable("queue_timeout")
+            if waiter.state == "rejected":
+                raise LLMUnavailable("saturated")
+        try:
+            yield
+        finally:
+            self._release()
+
+    @contextlib.asynccontextmanager
+    async def async_admit(self, priority=PRIORITY_NORMAL):
+        """Async form of admit(); waiting does not hold a thread."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+        waiter = self._enter(priority, wake)
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+            except asyncio.TimeoutError:
+                if not self._abandon(waiter):
+                    raise LLMUnavailable("queue_timeout")
+            except asyncio.CancelledError:
+                if self._abandon(waiter):
+                    self._release()  # Granted just as we were cancelled; pass it on
+                raise
+            if waiter.state == "rejected":
+                raise LLMUnavailable("saturated")
+        try:
+            yield
+        finally:
+            self._release()
+
+    # --- Rate limiting & retries ---
+
+    def backoff(self, attempt, error):
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))  # Full jitter
+        return max(delay, retry_after(error))
+
+    def _should_retry(self, attempt, error):
+        if not is_retryable(error):
+            return False
+        if attempt >= self.max_retries:
+            raise LLMUnavailable("retries_exhausted") from error
+        return True
+
+    async def _areserve(self):
+        if isinstance(self.bucket, SqliteTokenBucket):
+            return await asyncio.to_thread(self.bucket.reserve)  # A write transaction; keep it off the event loop
+        return self.bucket.reserve()
+
+    def call(self, fn, priority=PRIORITY_NORMAL):
+        """Run fn() under admission control, rate limiting and retries."""
+        with self.admit(priority):
+            for attempt in itertools.count():
+                time.sleep(self.bucket.reserve())
+                try:
+                    return fn()
+                except Exception as error:
+                    if not self._should_retry(attempt, error):
+                        raise
+                    time.sleep(self.backoff(attempt, error))
+
+    async def acall(self, fn, priority=PRIORITY_NORMAL):
+        """Async call(): fn() returns an awaitable (e.g. lambda: llm.ainvoke(prompt))."""
+        async with self.async_admit(priority):
+            for attempt in itertools.count():
+                await asyncio.sleep(await self._areserve())
+                try:
+                    return await fn()
+                except Exception as error:
+                    if not self._should_retry(attempt, error):
+                        raise
+                    await asyncio.sleep(self.backoff(attempt, error))
+
+    def stream(self, fn, priority=PRIORITY_NORMAL):
+        """Yield chunks from fn() (e.g. lambda: llm.stream(prompt)); retried only until the first chunk arrives."""
+        with self.admit(priority):
+            for attempt in itertools.count():
+                time.sleep(self.bucket.reserve())
+                started = False
+                try:
+                    for chunk in fn():
+                        started = True
+                        yield chunk
+                    return
+                except Exception as error:
+                    if started or not self._should_retry(attempt, error):
+                        raise
+                    time.sleep(self.backoff(attempt, error))
+
+    async def astream(self, fn, priority=PRIORITY_NORMAL):
+        """Async stream(): fn() returns an async iterator (e.g. lambda: llm.astream(prompt))."""
+        async with self.async_admit(priority):
+            for attempt in itertools.count():
+                await asyncio.sleep(await self._areserve())
+                started = False
+                try:
+                    async for chunk in fn():
+                        started = True
+                        yield chunk
+                    return
+                except Exception as error:
+                    if started or not self._should_retry(attempt, error):
+                        raise
+                    await asyncio.sleep(self.backoff(attempt, error))
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+
+import json
+import time
+import bisect
+import logging
+import threading
+import contextlib
+import contextvars
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# -------------------------------
+# Latency Histograms & Counters
+# -------------------------------
+
+# Seconds; wide enough to cover a dict lookup and a slow LLM call
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Characters in a flattened prompt
+SIZE_BUCKETS = (250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+
+turn_log = logging.getLogger("chatbot.turns")
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class TurnTrace:
+    """Per-turn record of stage timings and counters, emitted as one JSON log line."""
+
+    def __init__(self, **fields):
+        self.fields = fields
+        self.stages = {}
+        self.started = time.perf_counter()
+
+    def add_stage(self, stage, seconds):
+        self.stages[stage] = round(self.stages.get(stage, 0.0) + seconds * 1000, 3)
+
+    def as_dict(self):
+        return {
+            "event": "chat_turn",
+            **self.fields,
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 3),
+            "stages_ms": self.stages,
+        }
+
+
+class MetricsRegistry:
+    def __init__(self, json_log=False):
+        self.json_log = json_log  # Also log one structured JSON line per chat turn
+        self._histograms = {}  # (name, labels) -> Histogram
+        self._counters = {}  # (name, labels) -> float
+        self._gauges = {}  # name -> callable returning {labels tuple: value}
+        self._help = {}
+        self._lock = threading.Lock()
+        self._current_turn = contextvars.ContextVar("current_turn", default=None)
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+        turn = self._current_turn.get()
+        if turn is not None:
+            label = "_".join(str(value) for _, value in key[1])
+            field = f"{name}_{label}" if label else name
+            turn.fields[field] = turn.fields.get(field, 0) + amount
+
+    def gauge(self, name, collect, help_text=""):
+        """Register `collect()` -> {labels dict as tuple of pairs: value}, read at scrape time."""
+        self._gauges[name] = collect
+        self._help[name] = help_text
+
+    @contextlib.contextmanager
+    def span(self, stage):
+        """Time a block into chatbot_stage_seconds{stage=...} and the current turn's trace."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.observe("chatbot_stage_seconds", elapsed, stage=stage)
+            turn = self._current_turn.get()
+            if turn is not None:
+                turn.add_stage(stage, elapsed)
+
+    def begin_turn(self, **fields):
+        """
+        Start tracing a chat turn. Returns the trace for end_turn(); the trace is
+        also visible to spans run in this context. (Generators may be resumed in
+        other threads, so this avoids ContextVar tokens, which must be reset in
+        the context that created them.)
+        """
+        turn = TurnTrace(**fields)
+        self._current_turn.set(turn)
+        return turn
+
+    def end_turn(self, turn):
+        self._current_turn.set(None)
+        record = turn.as_dict()
+        self.observe("chatbot_turn_seconds", record["total_ms"] / 1000)
+        if self.json_log:
+            turn_log.info(json.dumps(record))
+        return record
+
+    @contextlib.contextmanager
+    def turn(self, **fields):
+        trace = self.begin_turn(**fields)
+        try:
+            yield trace
+        finally:
+            self.end_turn(trace)
+
+    def render_prometheus(self):
+        """Current metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        seen = set()
+        for (name, labels), histogram in histograms:
+            if name not in seen:
+                lines.append(f"# TYPE {name} histogram")
+                seen.add(name)
+            cumulative = 0
+            for bound, count in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {histogram.sum}")
+            lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+        for (name, labels), value in counters:
+            if name not in seen:
+                lines.append(f"# TYPE {name} counter")
+                seen.add(name)
+            lines.append(f"{name}{_labels(labels)} {value}")
+        for name, collect in sorted(self._gauges.items()):
+            if self._help.get(name):
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in sorted(collect().items()):
+                lines.append(f"{name}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+# -------------------------------
+# Metrics HTTP Endpoint
+# -------------------------------
+
+def start_metrics_server(registry, port, host="127.0.0.1"):
+    """Serve GET /metrics on `port` from a daemon thread; returns the server."""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Scrapes every few seconds would flood the console
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+import queue
+import atexit
+import logging
+import threading
+
+# -----------------------------------------
+# Post-Conversation Background Worker
+# -----------------------------------------
+
+class PostConversationWorker:
+    """
+    Keeps profile fields that describe past conversations (last_emotion,
+    emotion_trend, last_conversation) current without touching the request
+    path. Chat turns only enqueue small jobs; a daemon thread collects them
+    for up to `max_delay` seconds, summarizes finished sessions
+    `batch_size` at a time with `summarize_many(conversations)`, and writes
+    every changed profile with one `write_many([(user_id, fields), ...])`.
+    emotion_trend is passed as a function of the stored trend, so the store
+    extends it inside its own write transaction and concurrent writers
+    (other worker processes) cannot lose each other's labels.
+    With `autostart` the thread starts on the first submitted job, so jobs
+    from any caller are applied, not only those of the Gradio app.
+    """
+
+    def __init__(self, summarize_many, write_many, batch_size=8, max_delay=2.0,
+                 trend_length=10, max_queue=10000, autostart=False):
+        self._summarize_many = summarize_many  # [lines, ...] -> [summary, ...] in the same order
+        self._write_many = write_many  # Must apply callable field values to the stored value
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.trend_length = trend_length  # Sentiment labels kept in emotion_trend, oldest first
+        self.autostart = autostart
+        self.dropped = 0
+        self._queue = queue.Queue(max_queue)
+        self._lock = threading.Lock()  # Jobs are drained and processed under it, so batches apply in order
+        self._has_jobs = threading.Event()
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._exit_hook = False
+
+    def submit_turn(self, user_id, sentiment, set_last=True):
+        """
+        Add the turn's sentiment to emotion_trend. `set_last` also makes it the
+        user's last_emotion; session-based chats leave that to the end of the
+        session so the profile (and the prompt built from it) changes once.
+        """
+        self._put(("turn", user_id, (sentiment, set_last)))
+
+    def submit_session(self, user_id, lines):
+        """Summarize a finished conversation (prompt lines) into the user's last_conversation."""
+        if lines:
+            self._put(("session", user_id, lines))
+
+    def submit_fields(self, user_id, fields):
+        self._put(("fields", user_id, fields))
+
+    def _put(self, job):
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            self.dropped += 1  # Profile bookkeeping is best effort; never block a chat turn on it
+            return
+        self._has_jobs.set()
+        if self.autostart and self._thread is None and not self._stop.is_set():
+            self.start()
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def process(self, jobs):
+        """Apply one batch of jobs; returns {user_id: fields} as written."""
+        fields = {}
+        emotions = {}
+        last_emotions = {}
+        sessions = []
+        for kind, user_id, payload in jobs:
+            if kind == "turn":
+                sentiment, set_last = payload
+                emotions.setdefault(user_id, []).append(sentiment)
+                if set_last:
+                    last_emotions[user_id] = sentiment
+            elif kind == "session":
+                sessions.append((user_id, payload))
+            else:
+                fields.setdefault(user_id, {}).update(payload)
+
+        for user_id, labels in emotions.items():
+            fields.setdefault(user_id, {})["emotion_trend"] = self._extend_trend(labels)
+        for user_id, label in last_emotions.items():
+            fields[user_id]["last_emotion"] = label
+
+        for start in range(0, len(sessions), self.batch_size):
+            batch = sessions[start:start + self.batch_size]
+            try:
+                summaries = self._summarize_many([lines for _, lines in batch])
+            except Exception:
+                # E.g. the LLM turned background work away under load; the batch's other fields are still written
+                logging.getLogger(__name__).exception("Summarizing %d sessions failed", len(batch))
+                continue
+            for (user_id, _), summary in zip(batch, summaries):
+                fields.setdefault(user_id, {})["last_conversation"] = summary
+
+        if fields:
+            self._write_many(list(fields.items()))
+        return fields
+
+    def _extend_trend(self, labels):
+        def extend(trend):
+            return ((trend or []) + labels)[-self.trend_length:]
+        return extend
+
+    def flush(self):
+        """
+        Process everything queued so far in the calling thread. A batch the
+        worker thread is applying finishes first, so it is included too.
+        """
+        with self._lock:
+            jobs = self._drain()
+            return self.process(jobs) if jobs else {}
+
+    def _drain(self):
+        self._has_jobs.clear()  # Before draining, so a job put meanwhile sets it again
+        jobs = []
+        while True:
+            try:
+                jobs.append(self._queue.get_nowait())
+            except queue.Empty:
+                return jobs
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="post-conversation", daemon=True)
+                self._thread.start()
+                if not self._exit_hook:
+                    atexit.register(self.stop)  # Apply what is still queued when the process exits
+                    self._exit_hook = True
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+            self._thread = None
+        try:
+            self.flush()
+        except Exception:
+            logging.getLogger(__name__).exception("Post-conversation batch failed")
+
+    def _run(self):
+        while not self._stop.is_set():
+            if not self._has_jobs.wait(timeout=1):
+                continue
+            # Give other turns and sessions a moment to arrive so they share the writes and LLM calls
+            self._stop.wait(self.max_delay)
+            with self._lock:
+                try:
+                    jobs = self._drain()
+                    if jobs:
+                        self.process(jobs)
+                except Exception:
+                    logging.getLogger(__name__).exception("Post-conversation batch failed")
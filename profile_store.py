@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import sqlite3
+import threading
+
+# -------------------------------
+# Profile Store Backends
+# -------------------------------
+# Both backends expose the same per-user API so chatbot.py never needs to know
+# where profiles live:
+#   get(user_id)                 -> profile dict ({} if unknown)
+#   update(user_id, fields)      -> atomically merge fields into one profile; a callable
+#                                   value is applied to the field's current value (or None)
+#   update_many(items)           -> merge a batch of (user_id, fields) pairs in one write
+#   iter_profiles()              -> (user_id, profile) pairs, streamed where the backend allows
+#   changed_since(version)       -> (new version, [(user_id, profile), ...] written after `version`)
+#   load_all() / save_all(data)  -> whole-store access (legacy helpers, exports)
+
+# SQLite's default limit on "?" parameters per statement is 999 on older builds
+SQLITE_MAX_PARAMS = 500
+
+
+def merge_fields(profile, fields):
+    """Merge `fields` into `profile` in place, calling callable values with the current value."""
+    for key, value in fields.items():
+        profile[key] = value(profile.get(key)) if callable(value) else value
+    return profile
+
+
+class JsonProfileStore:
+    """
+    The original single-file store. Every read parses the whole file and every
+    write rewrites it, so it is only meant for small installs and the tests.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()  # Serializes read-modify-write within this process
+
+    def load_all(self):
+        if os.path.exists(self.path):
+            with open(self.path, "r") as file:
+                return json.load(file)
+        return {}
+
+    def save_all(self, user_data):
+        with self._lock:
+            self._write(user_data)
+
+    def get(self, user_id):
+        return self.load_all().get(user_id, {})
+
+    def update(self, user_id, fields):
+        with self._lock:
+            user_data = self.load_all()
+            merge_fields(user_data.setdefault(user_id, {}), fields)
+            self._write(user_data)
+
+    def update_many(self, items):
+        # One read and one rewrite for the whole batch instead of one per user
+        count = 0
+        with self._lock:
+            user_data = self.load_all()
+            for user_id, fields in items:
+                merge_fields(user_data.setdefault(user_id, {}), fields)
+                count += 1
+            self._write(user_data)
+        return count
+
+    def iter_profiles(self):
+        return iter(self.load_all().items())  # The file is parsed whole either way
+
+    def changed_since(self, version):
+        # The file's mtime is the version; any change means every profile is returned
+        try:
+            current = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None, []
+        if current == version:
+            return version, []
+        return current, list(self.load_all().items())
+
+    def _write(self, user_data):
+        # Write to a temp file and swap it in so readers never see a half-written file
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(user_data, file, indent=4)  # indent=4 keeps the file human-readable
+        os.replace(tmp_path, self.path)
+
+
+class SqliteProfileStore:
+    """
+    One row per user in a SQLite database running in WAL mode. Lookups and
+    updates hit the primary-key index, so their cost does not depend on how
+    many students are stored, and several processes can share the file.
+    Every write stamps its rows with the next store-wide version number, so
+    changed_since() finds other processes' writes with an index range scan.
+    """
+
+    def __init__(self, path, import_json_path=None):
+        self.path = path
+        self._local = threading.local()  # sqlite3 connections must stay on their own thread
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS profiles (user_id TEXT PRIMARY KEY, data TEXT NOT NULL)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(profiles)")}
+            if "version" not in columns:  # Databases created before versioning
+                conn.execute("ALTER TABLE profiles ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+            conn.execute("CREATE INDEX IF NOT EXISTS profiles_version ON profiles (version)")
+        if import_json_path:
+            self._import_json_once(import_json_path)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None lets us issue BEGIN IMMEDIATE ourselves
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        return _Transaction(self._conn())
+
+    @staticmethod
+    def _next_version(conn):
+        # Called inside a write transaction, so versions increase in commit order
+        return conn.execute("SELECT COALESCE(MAX(version), 0) + 1 FROM profiles").fetchone()[0]
+
+    def _import_json_once(self, json_path):
+        # The marker row makes the import run a single time, even across processes
+        if not os.path.exists(json_path):
+            return
+        with self._transaction() as conn:
+            done = conn.execute("SELECT 1 FROM meta WHERE key = 'json_imported'").fetchone()
+            if done:
+                return
+            with open(json_path, "r") as file:
+                user_data = json.load(file)
+            version = self._next_version(conn)
+            conn.executemany(
+                "INSERT OR IGNORE INTO profiles (user_id, data, version) VALUES (?, ?, ?)",
+                ((user_id, json.dumps(profile), version) for user_id, profile in user_data.items()),
+            )
+            conn.execute("INSERT INTO meta (key, value) VALUES ('json_imported', ?)", (json_path,))
+
+    def load_all(self):
+        conn = self._conn()
+        return {user_id: json.loads(data) for user_id, data in conn.execute("SELECT user_id, data FROM profiles")}
+
+    def save_all(self, user_data):
+        with self._transaction() as conn:
+            version = self._next_version(conn)
+            conn.execute("DELETE FROM profiles")
+            conn.executemany(
+                "INSERT INTO profiles (user_id, data, version) VALUES (?, ?, ?)",
+                ((user_id, json.dumps(profile), version) for user_id, profile in user_data.items()),
+            )
+
+    def get(self, user_id):
+        conn = self._conn()
+        row = conn.execute("SELECT data FROM profiles WHERE user_id = ?", (user_id,)).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def update_many(self, items):
+        """Merge a batch of (user_id, fields) pairs in one transaction; returns the pair count."""
+        batch = {}
+        count = 0
+        for user_id, fields in items:
+            batch.setdefault(user_id, []).append(fields)  # Applied in order, inside the transaction
+            count += 1
+        user_ids = list(batch)
+        with self._transaction() as conn:
+            existing = {}
+            for start in range(0, len(user_ids), SQLITE_MAX_PARAMS):
+                chunk = user_ids[start:start + SQLITE_MAX_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                existing.update(conn.execute(f"SELECT user_id, data FROM profiles WHERE user_id IN ({placeholders})", chunk))
+            version = self._next_version(conn)
+            conn.executemany(
+                "INSERT OR REPLACE INTO profiles (user_id, data, version) VALUES (?, ?, ?)",
+                (
+                    (user_id, json.dumps(self._merge_all(existing.get(user_id), updates)), version)
+                    for user_id, updates in batch.items()
+                ),
+            )
+        return count
+
+    @staticmethod
+    def _merge_all(data, updates):
+        profile = json.loads(data) if data else {}
+        for fields in updates:
+            merge_fields(profile, fields)
+        return profile
+
+    def iter_profiles(self):
+        # A fresh connection so the long read does not hold this thread's connection mid-statement
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            for user_id, data in conn.execute("SELECT user_id, data FROM profiles ORDER BY user_id"):
+                yield user_id, json.loads(data)
+        finally:
+            conn.close()
+
+    def update(self, user_id, fields):
+        # BEGIN IMMEDIATE takes the write lock before reading, so two workers
+        # updating the same user cannot lose each other's fields
+        with self._transaction() as conn:
+            row = conn.execute("SELECT data FROM profiles WHERE user_id = ?", (user_id,)).fetchone()
+            profile = merge_fields(json.loads(row[0]) if row else {}, fields)
+            conn.execute(
+                "INSERT OR REPLACE INTO profiles (user_id, data, version) VALUES (?, ?, ?)",
+                (user_id, json.dumps(profile), self._next_version(conn)),
+            )
+
+    def changed_since(self, version):
+        """Profiles written after `version` (None: all of them) and the version to pass next time."""
+        conn = self._conn()
+        rows = conn.execute(
+            "SELECT user_id, data, version FROM profiles WHERE version > ? ORDER BY version",
+            (-1 if version is None else version,),
+        ).fetchall()
+        if not rows:
+            return version, []
+        return rows[-1][2], [(user_id, json.loads(data)) for user_id, data, _ in rows]
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class _Transaction:
+    """Context manager wrapping a connection in BEGIN IMMEDIATE ... COMMIT."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+def create_profile_store(backend, json_path, db_path):
+    """Build the store named by `backend` ("json" or "sqlite")."""
+    if backend == "sqlite":
+        return SqliteProfileStore(db_path, import_json_path=json_path)
+    if backend == "json":
+        return JsonProfileStore(json_path)
+    raise ValueError(f"Unknown profile store backend: {backend}")
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+# -------------------------------
+# LLM Response Cache
+# -------------------------------
+
+_NON_WORD = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_message(text):
+    """Fold case, punctuation and spacing so near-identical messages share a key."""
+    text = _NON_WORD.sub("", text.lower().replace("’", "'").replace("'", ""))
+    return _WHITESPACE.sub(" ", text).strip()
+
+def make_cache_key(*parts):
+    return hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier cache for LLM replies. The memory tier is an LRU capped at
+    `max_entries`; the optional disk tier (a SQLite file) survives restarts.
+    Entries in both tiers expire `ttl` seconds after they were stored.
+    """
+
+    def __init__(self, max_entries=1024, ttl=3600, disk_path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value), oldest first
+        self._lock = threading.Lock()
+        self._disk = _DiskTier(disk_path) if disk_path else None
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+        entry = self._disk.get(key, now) if self._disk else None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, entry)  # Promote disk hits into memory
+            return entry[1]
+
+    def set(self, key, value):
+        entry = (time.time() + self.ttl, value)
+        with self._lock:
+            self._remember(key, entry)
+        if self._disk:
+            self._disk.set(key, entry)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+        if self._disk:
+            self._disk.clear()
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)  # Evict least recently used
+
+
+class _DiskTier:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, expires_at REAL, value TEXT)")
+        conn.execute("CREATE INDEX IF NOT EXISTS responses_expiry ON responses (expires_at)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, now):
+        row = self._conn().execute(
+            "SELECT expires_at, value FROM responses WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        return tuple(row) if row else None
+
+    def set(self, key, entry):
+        conn = self._conn()
+        conn.execute("INSERT OR REPLACE INTO responses (key, expires_at, value) VALUES (?, ?, ?)", (key, *entry))
+        conn.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+
+    def clear(self):
+        self._conn().execute("DELETE FROM responses")
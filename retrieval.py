@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import threading
+from functools import lru_cache
+import numpy as np
+
+# -------------------------------
+# In-Process Vector Index
+# -------------------------------
+# ingest.py exports the Chroma collection to two files next to it:
+#   index_embeddings.npy  float32 matrix, one L2-normalized row per chunk
+#   index_chunks.jsonl    one {"text", "source", "page"} object per row
+# The matrix is memory-mapped, so startup is instant and the OS page cache
+# shares it between worker processes.
+
+EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDINGS_FILE = "index_embeddings.npy"
+CHUNKS_FILE = "index_chunks.jsonl"
+
+
+def write_vector_index(index_dir, rows, count):
+    """
+    Write `count` (embedding, text, metadata) rows as a new index, streaming
+    the embeddings into a memory-mapped file. Files are swapped in atomically.
+    """
+    embeddings_path = os.path.join(index_dir, EMBEDDINGS_FILE)
+    chunks_path = os.path.join(index_dir, CHUNKS_FILE)
+    matrix = None
+    with open(f"{chunks_path}.tmp", "w") as chunks_file:
+        for row_number, (embedding, text, metadata) in enumerate(rows):
+            vector = np.asarray(embedding, dtype=np.float32)
+            if matrix is None:
+                matrix = np.lib.format.open_memmap(f"{embeddings_path}.tmp", mode="w+", dtype=np.float32, shape=(count, len(vector)))
+            norm = np.linalg.norm(vector)
+            matrix[row_number] = vector / norm if norm else vector
+            chunks_file.write(json.dumps({"text": text, **(metadata or {})}) + "\n")
+    if matrix is None:
+        # Empty collection: drop any old index so retrieval switches itself off
+        for path in (embeddings_path, chunks_path, f"{chunks_path}.tmp"):
+            if os.path.exists(path):
+                os.remove(path)
+        return
+    matrix.flush()
+    del matrix
+    os.replace(f"{embeddings_path}.tmp", embeddings_path)
+    os.replace(f"{chunks_path}.tmp", chunks_path)
+
+
+class VectorIndex:
+    """Exact top-k cosine search over the memory-mapped chunk matrix."""
+
+    def __init__(self, embeddings, chunks_path):
+        self.embeddings = embeddings
+        self._chunks_path = chunks_path
+        self._offsets = self._line_offsets(chunks_path)  # Row number -> byte offset in the JSONL file
+
+    @classmethod
+    def load(cls, index_dir):
+        """Open the index in `index_dir`, or return None if none has been built."""
+        embeddings_path = os.path.join(index_dir, EMBEDDINGS_FILE)
+        chunks_path = os.path.join(index_dir, CHUNKS_FILE)
+        if not (os.path.exists(embeddings_path) and os.path.exists(chunks_path)):
+            return None
+        return cls(np.load(embeddings_path, mmap_mode="r"), chunks_path)
+
+    @staticmethod
+    def _line_offsets(path):
+        offsets = []
+        position = 0
+        with open(path, "rb") as file:
+            for line in file:
+                offsets.append(position)
+                position += len(line)
+        return np.asarray(offsets, dtype=np.int64)
+
+    def __len__(self):
+        return self.embeddings.shape[0]
+
+    def search(self, query_vector, k=3):
+        """Return [(score, row)] for the k best rows, best first."""
+        scores = self.embeddings @ query_vector  # Rows are normalized, so this is cosine similarity
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]  # O(n) selection instead of a full sort
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[row]), int(row)) for row in top]
+
+    def chunk(self, row):
+        with open(self._chunks_path, "rb") as file:
+            file.seek(self._offsets[row])
+            return json.loads(file.readline())
+
+
+class Retriever:
+    """
+    Turns a user message into knowledge-base passages. Query embeddings are
+    LRU-cached, so repeated questions skip the embedding model entirely.
+    """
+
+    def __init__(self, index, embed, cache_size=4096, min_score=0.3):
+        self.index = index
+        self.min_score = min_score
+        self._embed_cached = lru_cache(maxsize=cache_size)(embed)
+
+    def retrieve(self, query, k=3):
+        query_vector = self._embed_cached(" ".join(query.lower().split()))
+        return [
+            self.index.chunk(row)["text"]
+            for score, row in self.index.search(query_vector, k)
+            if score >= self.min_score
+        ]
+
+
+class SentenceTransformerEmbedder:
+    """Callable query embedder; the model is loaded on first use."""
+
+    def __init__(self, model_name=EMBEDDING_MODEL):
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    def __call__(self, text):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer  # Pulls in torch; only load when retrieval is used
+                    self._model = SentenceTransformer(self.model_name)
+        vector = self._model.encode([text], normalize_embeddings=True)[0]
+        return np.asarray(vector, dtype=np.float32)
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+# Usage:
+#   python roster.py import students.csv [--backend sqlite] [--batch-size 5000]
+#   python roster.py import students.jsonl
+#   python roster.py export profiles.jsonl     # or "-" for stdout
+
+import sys
+import csv
+import json
+import argparse
+import datetime
+import itertools
+from profile_store import create_profile_store
+from chatbot import USER_DATA_FILE, PROFILE_DB_FILE, PROFILE_STORE_BACKEND
+
+# -------------------------------
+# Roster Format
+# -------------------------------
+# One student per CSV row or JSONL line. user_id is required; the profile
+# fields below are optional. CSV deadlines are either a JSON object or
+# "Task=YYYY-MM-DD;Other task=YYYY-MM-DD". Any other JSONL keys (e.g. from an
+# export) are imported unchanged.
+
+PROFILE_FIELDS = ["name", "major", "year_of_study", "common_stressors", "university", "deadlines"]
+IMPORT_BATCH_SIZE = 5000  # Profiles written per SQLite transaction
+
+
+class RosterError(ValueError):
+    pass
+
+
+def parse_deadlines(value):
+    if isinstance(value, dict):
+        return value
+    value = (value or "").strip()
+    if not value:
+        return {}
+    if value.startswith("{"):
+        return json.loads(value)
+    deadlines = {}
+    for item in value.split(";"):
+        if item.strip():
+            task, _, date = item.partition("=")
+            deadlines[task.strip()] = date.strip()
+    return deadlines
+
+def validate_profile(record):
+    """Turn one roster record into (user_id, profile fields); raises RosterError if it is invalid."""
+    if isinstance(record, RosterError):
+        raise record  # The line could not be read at all
+    if not isinstance(record, dict):
+        raise RosterError(f"expected an object, got {type(record).__name__}")
+    if None in record:
+        raise RosterError("more cells than header columns")  # csv.DictReader keys the extras as None
+    record = dict(record)
+    user_id = str(record.pop("user_id", "") or "").strip()
+    if not user_id:
+        raise RosterError("missing user_id")
+    fields = {}
+    for key, value in record.items():
+        if value is None or value == "":
+            continue  # Blank CSV cells leave the stored value alone
+        if key == "deadlines":
+            try:
+                value = parse_deadlines(value)
+                for task, date in value.items():
+                    datetime.date.fromisoformat(date)  # Reminders parse these on every lookup
+            except (ValueError, TypeError, AttributeError) as error:
+                raise RosterError(f"bad deadlines for {user_id}: {error}")
+        elif key in PROFILE_FIELDS:
+            value = str(value).strip()
+        fields[key] = value
+    fields.setdefault("name", user_id)  # Same default setup_profile uses
+    return user_id, fields
+
+def read_roster(path):
+    """
+    Yield (line number, record) from a CSV or JSONL roster without loading it
+    whole. A JSONL line that is not valid JSON comes back as a RosterError.
+    """
+    with open(path, "r", newline="", encoding="utf-8") as file:
+        if path.endswith(".csv"):
+            for line_number, row in enumerate(csv.DictReader(file), start=2):
+                yield line_number, row
+        else:
+            for line_number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as error:
+                    record = RosterError(f"invalid JSON: {error.msg}")
+                yield line_number, record
+
+# -------------------------------
+# Import & Export
+# -------------------------------
+
+def import_roster(store, path, batch_size=IMPORT_BATCH_SIZE, errors=None):
+    """
+    Validate and merge every profile in `path` into `store`, `batch_size`
+    profiles per write. Invalid rows are skipped and described in `errors`.
+    Returns the number of profiles written. A running reminder scheduler
+    picks up imported deadlines from the store before its next sweep.
+    """
+    errors = errors if errors is not None else []
+
+    def valid_profiles():
+        for line_number, record in read_roster(path):
+            try:
+                yield validate_profile(record)
+            except RosterError as error:
+                errors.append(f"{path}:{line_number}: {error}")
+
+    profiles = valid_profiles()
+    written = 0
+    while True:
+        batch = list(itertools.islice(profiles, batch_size))
+        if not batch:
+            return written
+        written += store.update_many(batch)
+
+def export_profiles(store, file):
+    """Write every profile to `file` as JSONL ({"user_id": ..., **profile}); returns the count."""
+    count = 0
+    for user_id, profile in store.iter_profiles():
+        file.write(json.dumps({"user_id": user_id, **profile}) + "\n")
+        count += 1
+    return count
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import or export student profiles.")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("path", help="CSV/JSONL roster to import, or JSONL file to export to (- for stdout)")
+    parser.add_argument("--backend", default=PROFILE_STORE_BACKEND, choices=["json", "sqlite"])
+    parser.add_argument("--json-path", default=USER_DATA_FILE)
+    parser.add_argument("--db-path", default=PROFILE_DB_FILE)
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE,
+                        help="Profiles per write (sqlite); the JSON file is always rewritten once")
+    args = parser.parse_args(argv)
+
+    store = create_profile_store(args.backend, args.json_path, args.db_path)
+    if args.command == "export":
+        if args.path == "-":
+            count = export_profiles(store, sys.stdout)
+        else:
+            with open(args.path, "w", encoding="utf-8") as file:
+                count = export_profiles(store, file)
+        print(f"Exported {count} profiles.", file=sys.stderr)
+        return 0
+
+    errors = []
+    # The JSON store rewrites the whole file per write, so give it a single batch
+    batch_size = args.batch_size if args.backend == "sqlite" else sys.maxsize
+    written = import_roster(store, args.path, batch_size, errors)
+    for error in errors[:20]:
+        print(error, file=sys.stderr)
+    if len(errors) > 20:
+        print(f"... and {len(errors) - 20} more", file=sys.stderr)
+    print(f"Imported {written} profiles, skipped {len(errors)} invalid rows.", file=sys.stderr)
+    return 1 if errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
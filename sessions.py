@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+
+import sys
+import time
+import sqlite3
+import logging
+import threading
+import contextlib
+from collections import OrderedDict
+
+# -------------------------------
+# Conversation Turns & Sessions
+# -------------------------------
+
+# Approximate bytes per turn beyond its two strings: the Turn, two UI message dicts and list slots
+TURN_OVERHEAD_BYTES = 600
+
+
+class Turn:
+    """One (user, bot) exchange. Unpacks like the (user, bot) tuples used elsewhere."""
+
+    __slots__ = ("user", "bot")
+
+    def __init__(self, user, bot):
+        self.user = user
+        self.bot = bot
+
+    def __iter__(self):
+        yield self.user
+        yield self.bot
+
+    def __eq__(self, other):
+        return tuple(self) == tuple(other)
+
+    def __repr__(self):
+        return f"Turn({self.user!r}, {self.bot!r})"
+
+
+class Session:
+    """
+    Server-side conversation for one browser session. Behaves like the list of
+    (user, bot) turns the chat functions take as `history`, and keeps the
+    Gradio message list alongside it so each turn appends to it instead of
+    rebuilding it.
+    """
+
+    __slots__ = ("session_id", "user_id", "turns", "ui_history", "nbytes", "last_active", "_pending", "_accounted", "_stored")
+
+    def __init__(self, session_id, user_id):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.turns = []
+        self.ui_history = []
+        self.nbytes = 0
+        self.last_active = time.monotonic()
+        self._pending = False  # start_turn() added a reply placeholder that append() fills in
+        self._accounted = 0  # nbytes as last counted by the SessionStore
+        self._stored = 0  # Turns already written to a shared (SQLite) store
+
+    def __len__(self):
+        return len(self.turns)
+
+    def __getitem__(self, index):
+        return self.turns[index]
+
+    def __iter__(self):
+        return iter(self.turns)
+
+    def start_turn(self, user_message):
+        """Add the new message and an empty reply to stream into; returns ui_history."""
+        self.ui_history.append({"role": "user", "content": user_message})
+        self.ui_history.append({"role": "assistant", "content": ""})
+        self._pending = True
+        return self.ui_history
+
+    def cancel_turn(self):
+        """Drop the placeholder start_turn() added if the turn never completed."""
+        if self._pending:
+            del self.ui_history[-2:]
+            self._pending = False
+
+    def append(self, turn):
+        user, bot = turn
+        self.turns.append(Turn(user, bot))
+        if self._pending:
+            self.ui_history[-1]["content"] = bot
+            self._pending = False
+        else:
+            self.ui_history.append({"role": "user", "content": user})
+            self.ui_history.append({"role": "assistant", "content": bot})
+        self.nbytes += sys.getsizeof(user) + sys.getsizeof(bot) + TURN_OVERHEAD_BYTES
+        self.last_active = time.monotonic()
+
+
+class SessionStore:
+    """
+    Sessions keyed by session id, in LRU order. Sessions idle for longer than
+    `ttl` seconds, and the least recently used ones whenever the total size
+    passes `max_bytes`, are evicted. Evicted sessions are handed to
+    `on_evict(session)` on the next sweep(), so summarizing them never slows
+    down the chat turn that triggered the eviction.
+    """
+
+    _clock = staticmethod(time.monotonic)  # Time base for last_active and sweep(now)
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, ttl=1800, on_evict=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self.evictions = 0
+        self._sessions = OrderedDict()  # session_id -> Session, least recently used first
+        self._bytes = 0
+        self._evicted = []  # Waiting for on_evict
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, session_id, user_id):
+        """The session for `session_id`, starting a new one if it is unknown or the user changed."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and session.user_id != user_id:
+                self._remove(session_id)
+                session = None
+            if session is None:
+                session = self._sessions[session_id] = Session(session_id, user_id)
+            self._sessions.move_to_end(session_id)
+            session.last_active = time.monotonic()
+            return session
+
+    def touch(self, session):
+        """Count a session's new turns against the memory cap and mark it recently used."""
+        with self._lock:
+            if self._sessions.get(session.session_id) is not session:
+                return  # Evicted or replaced while the turn was running
+            self._bytes += session.nbytes - session._accounted
+            session._accounted = session.nbytes
+            self._sessions.move_to_end(session.session_id)
+            # Never evict the session being used; one session alone may exceed the cap
+            while self._bytes > self.max_bytes and len(self._sessions) > 1:
+                self._remove(next(iter(self._sessions)))
+
+    def discard(self, session_id):
+        """End a session now (e.g. the chat was cleared); it is still handed to on_evict."""
+        with self._lock:
+            if session_id in self._sessions:
+                self._remove(session_id)
+
+    def sweep(self, now=None):
+        """Evict sessions idle past the TTL, then run on_evict for everything evicted so far."""
+        evicted = self._expire(self._clock() if now is None else now)
+        for session in evicted:
+            if self.on_evict:
+                try:
+                    self.on_evict(session)
+                except Exception:
+                    # One failed summary must not stop the sweeper or lose the other sessions
+                    logging.getLogger(__name__).exception("Persisting session %s failed", session.session_id)
+        return len(evicted)
+
+    def _expire(self, now):
+        """Evict idle sessions; returns every session evicted since the last call."""
+        with self._lock:
+            for session_id in [key for key, session in self._sessions.items() if now - session.last_active > self.ttl]:
+                self._remove(session_id)
+            evicted, self._evicted = self._evicted, []
+        return evicted
+
+    def stats(self):
+        with self._lock:
+            return {"sessions": len(self._sessions), "bytes": self._bytes, "evictions": self.evictions}
+
+    def _remove(self, session_id):
+        # Caller holds the lock
+        session = self._sessions.pop(session_id)
+        self._bytes -= session._accounted
+        self.evictions += 1
+        if len(session):
+            self._evicted.append(session)
+
+    def start(self, interval=60):
+        """Sweep from a daemon thread every `interval` seconds."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(interval,), name="session-sweeper", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.sweep(now=float("inf"))  # Persist whatever is still open
+
+    def _run(self, interval):
+        while not self._stop.wait(interval):
+            self.sweep()
+
+
+class SqliteSessionStore(SessionStore):
+    """
+    SessionStore shared by several app processes through one SQLite file.
+    Finished turns are appended to the database, so any worker can carry on
+    a conversation; each worker also keeps up to `local_sessions` recently
+    used sessions in memory and reloads one only when another worker has
+    added turns to it. Idle and over-budget sessions are read and deleted
+    in one transaction, so exactly one worker hands each to on_evict.
+    """
+
+    _clock = staticmethod(time.time)  # Shared between processes, so wall-clock time
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024, ttl=1800, on_evict=None, local_sessions=1000):
+        super().__init__(max_bytes, ttl, on_evict)
+        self.path = path
+        self.local_sessions = local_sessions
+        self._local = threading.local()
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session_id TEXT PRIMARY KEY, user_id TEXT, turns INTEGER, nbytes INTEGER, last_active REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_last_active ON sessions (last_active)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS session_turns ("
+                "session_id TEXT, seq INTEGER, user TEXT, bot TEXT, PRIMARY KEY (session_id, seq))"
+            )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers cannot both claim a session
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def get(self, session_id, user_id):
+        with self._transaction() as conn:
+            row = conn.execute("SELECT user_id, turns FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            if row is not None and row[0] != user_id:
+                self._claim(conn, [session_id])
+                row = None
+            if row is None:
+                conn.execute("INSERT INTO sessions VALUES (?, ?, 0, 0, ?)", (session_id, user_id, self._clock()))
+            else:
+                conn.execute("UPDATE sessions SET last_active = ? WHERE session_id = ?", (self._clock(), session_id))
+            stored = row[1] if row is not None else 0
+
+            with self._lock:
+                session = self._sessions.get(session_id)
+            if session is None or session.user_id != user_id or session._stored != stored:
+                session = Session(session_id, user_id)
+                for turn in conn.execute("SELECT user, bot FROM session_turns WHERE session_id = ? ORDER BY seq", (session_id,)):
+                    session.append(turn)
+                session._stored = len(session)
+                session._accounted = session.nbytes
+
+        with self._lock:
+            self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.local_sessions:
+                self._sessions.popitem(last=False)  # Only the local copy; the database keeps it
+        session.last_active = time.monotonic()
+        return session
+
+    def touch(self, session):
+        """Write the session's new turns, then evict the oldest sessions if the total passes the cap."""
+        new_turns = session.turns[session._stored:]
+        with self._transaction() as conn:
+            updated = conn.execute(
+                "UPDATE sessions SET turns = ?, nbytes = ?, last_active = ? WHERE session_id = ? AND user_id = ?",
+                (len(session), session.nbytes, self._clock(), session.session_id, session.user_id),
+            ).rowcount
+            if not updated:
+                return  # Evicted or replaced (possibly by another worker) while the turn was running
+            conn.executemany(
+                "INSERT OR REPLACE INTO session_turns VALUES (?, ?, ?, ?)",
+                ((session.session_id, session._stored + offset, turn.user, turn.bot) for offset, turn in enumerate(new_turns)),
+            )
+            excess = (conn.execute("SELECT SUM(nbytes) FROM sessions").fetchone()[0] or 0) - self.max_bytes
+            if excess > 0:
+                victims = []
+                for session_id, nbytes in conn.execute(
+                    "SELECT session_id, nbytes FROM sessions WHERE session_id != ? ORDER BY last_active", (session.session_id,)
+                ):
+                    if excess <= 0:
+                        break
+                    victims.append(session_id)
+                    excess -= nbytes
+                self._claim(conn, victims)
+        session._stored = len(session)
+        session._accounted = session.nbytes
+
+    def discard(self, session_id):
+        with self._transaction() as conn:
+            self._claim(conn, [session_id])
+
+    def _expire(self, now):
+        with self._transaction() as conn:
+            idle = [row[0] for row in conn.execute("SELECT session_id FROM sessions WHERE last_active < ?", (now - self.ttl,))]
+            self._claim(conn, idle)
+        with self._lock:
+            evicted, self._evicted = self._evicted, []
+        return evicted
+
+    def _claim(self, conn, session_ids):
+        # Caller holds a write transaction; the sessions become this worker's to hand to on_evict
+        for session_id in session_ids:
+            row = conn.execute("SELECT user_id FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            if row is None:
+                continue
+            session = Session(session_id, row[0])
+            for turn in conn.execute("SELECT user, bot FROM session_turns WHERE session_id = ? ORDER BY seq", (session_id,)):
+                session.append(turn)
+            conn.execute("DELETE FROM session_turns WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            with self._lock:
+                self._sessions.pop(session_id, None)
+                self.evictions += 1
+                if len(session):
+                    self._evicted.append(session)
+
+    def stats(self):
+        count, nbytes = self._conn().execute("SELECT COUNT(*), SUM(nbytes) FROM sessions").fetchone()
+        return {"sessions": count, "bytes": nbytes or 0, "evictions": self.evictions}
+
+    def stop(self):
+        # Other workers may still be serving the open sessions, so only idle ones are persisted
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.sweep()
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -3,8 +3,13 @@ import sys
 import unittest
 import json
 import random
+import asyncio
+import subprocess
+import shutil
+import tempfile
+import threading
 from datetime import date, timedelta
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 
 # Add the project's root directory to sys.path so we can import the main module.
 sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
@@ -16,22 +21,53 @@ from chatbot import (
     update_student_profile,
     get_mental_health_resources,
     analyze_sentiment,
+    analyze_sentiment_batch,
     load_llm,
+    get_llm,
     generate_summary,
     check_deadlines,
     send_daily_motivation,
+    deliver_deadline_reminder,
+    refresh_deadline_index,
+    reset_deadline_index,
+    get_profile_store,
+    set_profile_store,
     chatbot_response,
+    chatbot_response_stream,
+    chatbot_response_async,
+    gather_context,
+    gather_context_async,
     setup_profile,
+    reset_llm_clients,
+    metrics,
+    session_response_astream,
+    get_session,
+    end_session,
+    persist_session_summary,
+    flush_post_conversation,
+    summarize_conversations,
+    turn_priority,
+    DEGRADED_REPLY,
     USER_DATA_FILE,
     MOTIVATIONAL_QUOTES,
 )
+from llm_client import StubLLM
+from profile_store import JsonProfileStore
+from sessions import SqliteSessionStore
+from response_cache import ResponseCache
+
+def prompt_text(call):
+    # Chat turns send (role, content) messages; join them so assertions can search the whole prompt
+    return "\n".join(content for _, content in call.args[0])
 
 class TestChatbotUnit(unittest.TestCase):
     def setUp(self):
+        flush_post_conversation()  # Apply background jobs queued by earlier tests before the cleanup
         # Remove user_data.json before each test to ensure tests remain isolated.
         if os.path.exists(USER_DATA_FILE):
             os.remove(USER_DATA_FILE)
         random.seed(42)  # Seed for consistent outputs in tests
+        reset_llm_clients()  # Drop pooled clients so patched load_llm/ChatGroq take effect
 
     def tearDown(self):
         # Clean up user_data.json after each test.
@@ -74,6 +110,38 @@ class TestChatbotUnit(unittest.TestCase):
         result = get_mental_health_resources("user1")
         self.assertIn("https://www.centennialcollege.ca/student-health", result)
 
+    def test_get_mental_health_resources_resolves_variants(self):
+        for stored in ("centennial college", "Centennial", "Centenial Colege"):
+            update_user_data("user1", "university", stored)
+            self.assertIn("https://www.centennialcollege.ca/student-health", get_mental_health_resources("user1"))
+        update_user_data("user1", "university", "UofT")
+        self.assertIn("https://mentalhealth.utoronto.ca/", get_mental_health_resources("user1"))
+
+        # The canonical name is cached on the profile, so the next lookup skips the index
+        flush_post_conversation()
+        self.assertEqual(load_user_data()["user1"]["resolved_university"]["canonical"], "University of Toronto")
+        with patch("chatbot.get_resource_index") as mock_index:
+            mock_index.return_value.resource.return_value = "cached"
+            get_mental_health_resources("user1")
+            mock_index.return_value.resolve.assert_not_called()
+
+    def test_matches_from_an_older_matcher_are_resolved_again(self):
+        # Stored by the old matcher, which confused any "University of ..." with Toronto
+        update_user_data("user1", "university", "University of Ottawa")
+        update_user_data("user1", "resolved_university", {"name": "University of Ottawa", "canonical": "University of Toronto"})
+        self.assertNotIn("utoronto", get_mental_health_resources("user1"))
+
+    def test_unknown_university_is_not_cached(self):
+        update_user_data("user1", "university", "Unknown Uni")
+        get_mental_health_resources("user1")
+        flush_post_conversation()
+        self.assertNotIn("resolved_university", load_user_data()["user1"])
+        # Added to the resource file later: found on the next lookup
+        with patch("chatbot.get_resource_index") as mock_index:
+            mock_index.return_value.resolve.return_value = "Unknown Uni"
+            mock_index.return_value.resource.return_value = "https://unknown.example/support"
+            self.assertIn("https://unknown.example/support", get_mental_health_resources("user1"))
+
     def test_get_mental_health_resources_unknown_university(self):
         update_user_data("user1", "university", "Unknown Uni")
         result = get_mental_health_resources("user1")
@@ -90,7 +158,15 @@ class TestChatbotUnit(unittest.TestCase):
         self.assertEqual(analyze_sentiment("I love this"), "excited")
         self.assertEqual(analyze_sentiment("Amazing news!"), "excited")
 
+    def test_analyze_sentiment_batch(self):
+        texts = ["I hate everything", "This is annoying", "Hello world", "I love this", "Amazing news!"]
+        expected = [analyze_sentiment(text) for text in texts]
+        self.assertEqual(analyze_sentiment_batch(texts), expected)
+        # Large enough to go through the process pool
+        self.assertEqual(analyze_sentiment_batch(texts * 400, processes=2), expected * 400)
+
     # --- LLM and Summary Functions ---
+    @patch.dict(os.environ, {"GROQ_API_KEY": "test-key"})
     @patch("chatbot.ChatGroq")
     def test_load_llm(self, mock_chatgroq):
         mock_instance = MagicMock()
@@ -98,11 +174,32 @@ class TestChatbotUnit(unittest.TestCase):
         llm = load_llm()
         mock_chatgroq.assert_called_once_with(
             temperature=0.6,
-            groq_api_key="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",
+            groq_api_key="test-key",
             model_name="llama-3.3-70b-versatile"
         )
         self.assertEqual(llm, mock_instance)
 
+    @patch.dict(os.environ, {"GROQ_API_KEY": "test-key"})
+    @patch("chatbot.ChatGroq")
+    def test_get_llm_reuses_client(self, mock_chatgroq):
+        first = get_llm()
+        second = get_llm()
+        self.assertIs(first, second)
+        mock_chatgroq.assert_called_once()
+
+    @patch.dict(os.environ, {"GROQ_API_KEY": ""})
+    @patch("chatbot.ChatGroq")
+    def test_load_llm_requires_api_key(self, mock_chatgroq):
+        with self.assertRaisesRegex(ValueError, "GROQ_API_KEY"):
+            load_llm()
+        mock_chatgroq.assert_not_called()
+
+    @patch.dict(os.environ, {"LLM_BACKEND": "stub"})
+    def test_load_llm_stub_backend(self):
+        llm = load_llm()
+        self.assertEqual(llm.invoke("User: hi").content, StubLLM.DEFAULT_REPLY)
+
+    @patch.dict(os.environ, {"GROQ_API_KEY": "test-key"})
     @patch("chatbot.ChatGroq")
     def test_generate_summary(self, mock_chatgroq):
         mock_llm = MagicMock()
@@ -136,6 +233,51 @@ class TestChatbotUnit(unittest.TestCase):
         message = check_deadlines("user1")
         self.assertEqual(message, "No major deadlines soon. Keep up the good work!")
 
+    @patch("chatbot.load_llm")
+    def test_pending_reminder_shared_once(self, mock_load_llm):
+        mock_llm = MagicMock()
+        mock_response = MagicMock()
+        mock_response.content = "Don't forget your exam!"
+        mock_llm.invoke.return_value = mock_response
+        mock_load_llm.return_value = mock_llm
+
+        deliver_deadline_reminder("user1", ["Exam"])
+        self.assertIn("Exam", load_user_data()["user1"]["pending_reminder"])
+        chatbot_response("Hi", [], "user1")
+        self.assertIn("Scheduled reminder: Reminder! You have upcoming deadlines: Exam.", prompt_text(mock_llm.invoke.call_args))
+        chatbot_response("Hi again", [], "user1")
+        self.assertNotIn("Scheduled reminder", prompt_text(mock_llm.invoke.call_args))
+
+    def test_refresh_deadline_index_picks_up_store_writes(self):
+        reset_deadline_index()
+        self.assertEqual(refresh_deadline_index(), 0)
+        # Written straight to the store, as another worker process would
+        get_profile_store().update("user2", {"deadlines": {"Essay": date.today().isoformat()}})
+        self.assertEqual(refresh_deadline_index(), 1)
+        self.assertEqual(refresh_deadline_index(), 0)
+
+    @patch("chatbot.load_llm", return_value=StubLLM())
+    def test_swapping_stores_applies_queued_writes_to_the_old_one(self, mock_load_llm):
+        path = os.path.join(tempfile.mkdtemp(), "scratch.json")
+        scratch = JsonProfileStore(path)
+        set_profile_store(scratch)
+        try:
+            chatbot_response("I'm so sad", [], "student1")  # Queues an emotion_trend write
+        finally:
+            set_profile_store(None)
+        self.assertEqual(scratch.get("student1")["emotion_trend"], ["sad"])
+        flush_post_conversation()
+        self.assertNotIn("student1", load_user_data())
+        os.remove(path)
+        os.rmdir(os.path.dirname(path))
+
+    def test_undelivered_reminders_accumulate(self):
+        deliver_deadline_reminder("user1", ["Exam"])
+        deliver_deadline_reminder("user1", ["Essay"])
+        reminder = load_user_data()["user1"]["pending_reminder"]
+        self.assertIn("Exam", reminder)
+        self.assertIn("Essay", reminder)
+
     def test_send_daily_motivation(self):
         quote = send_daily_motivation()
         self.assertIn(quote, MOTIVATIONAL_QUOTES)
@@ -163,6 +305,274 @@ class TestChatbotUnit(unittest.TestCase):
         expected_history = [("Hi", "Hello!"), ("I'm stressed", "Sorry to hear that. How can I help?")]
         self.assertEqual(updated_history, expected_history)
 
+    @patch("chatbot.load_llm")
+    def test_chatbot_response_stream(self, mock_load_llm):
+        mock_llm = MagicMock()
+        chunks = []
+        for text in ["Sorry ", "to hear ", "that."]:
+            chunk = MagicMock()
+            chunk.content = text
+            chunks.append(chunk)
+        mock_llm.stream.return_value = iter(chunks)
+        mock_load_llm.return_value = mock_llm
+
+        history = [("Hi", "Hello!")]
+        partial_replies = []
+        # The same UI list is updated in place, so read each partial reply as it is yielded
+        for final_ui_history, final_history in chatbot_response_stream("I'm stressed", history, "user1"):
+            partial_replies.append(final_ui_history[-1]["content"])
+        self.assertEqual(partial_replies, ["Sorry ", "Sorry to hear ", "Sorry to hear that.", "Sorry to hear that."])
+        self.assertEqual(final_ui_history[2], {"role": "user", "content": "I'm stressed"})
+        self.assertEqual(final_history, [("Hi", "Hello!"), ("I'm stressed", "Sorry to hear that.")])
+
+    def test_gather_context_async_matches_sync(self):
+        update_student_profile("user1", "CS", "2", "exams", "Centennial College")
+        update_user_data("user1", "deadlines", {"Exam": date.today().isoformat()})
+        for message in ["What's on my schedule?", "I hate everything", "Hello world", "Can you help me?"]:
+            self.assertEqual(asyncio.run(gather_context_async(message, "user1")), gather_context(message, "user1"))
+
+    @patch("chatbot.load_llm")
+    def test_chatbot_response_async(self, mock_load_llm):
+        mock_llm = MagicMock()
+        mock_response = MagicMock()
+        mock_response.content = "Sorry to hear that. How can I help?"
+        mock_llm.ainvoke = AsyncMock(return_value=mock_response)
+        mock_load_llm.return_value = mock_llm
+
+        history = [("Hi", "Hello!")]
+        ui_history, updated_history = asyncio.run(chatbot_response_async("I'm stressed", history, "user1"))
+        self.assertEqual(ui_history[-1], {"role": "assistant", "content": "Sorry to hear that. How can I help?"})
+        self.assertEqual(updated_history[-1], ("I'm stressed", "Sorry to hear that. How can I help?"))
+        mock_llm.ainvoke.assert_awaited_once()
+
+    @patch("chatbot.load_llm")
+    def test_chatbot_response_folds_long_history(self, mock_load_llm):
+        mock_llm = MagicMock()
+        mock_response = MagicMock()
+        mock_response.content = "Earlier turns summarized."
+        mock_llm.invoke.return_value = mock_response
+        mock_load_llm.return_value = mock_llm
+
+        history = [(f"question {i}", f"answer {i}") for i in range(14)]  # Past 2 * CONTEXT_MAX_TURNS
+        chatbot_response("One more thing", history, "user1")
+        prompt_str = prompt_text(mock_llm.invoke.call_args_list[-1])
+        self.assertIn("Summary of earlier turns in this conversation: Earlier turns summarized.", prompt_str)
+        self.assertNotIn("question 0", prompt_str)
+        self.assertIn("question 9", prompt_str)
+        flush_post_conversation()  # The summary is written back by the background worker
+        self.assertEqual(load_user_data()["user1"]["last_conversation"], "Earlier turns summarized.")
+
+    @patch("chatbot.load_llm")
+    def test_chatbot_response_cache(self, mock_load_llm):
+        mock_llm = MagicMock()
+        mock_response = MagicMock()
+        mock_response.content = "Exams are tough. Try short study blocks."
+        mock_llm.invoke.return_value = mock_response
+        mock_load_llm.return_value = mock_llm
+
+        with patch("chatbot._response_cache", ResponseCache()) as cache:
+            chatbot_response("I'm stressed about exams", [], "user1")
+            ui_history, _ = chatbot_response("im stressed about exams!", [], "user1")
+            self.assertEqual(ui_history[-1]["content"], "Exams are tough. Try short study blocks.")
+            self.assertEqual(mock_llm.invoke.call_count, 1)
+            self.assertEqual(cache.stats()["hits"], 1)
+
+            # Deadline questions are time-sensitive and always reach the LLM
+            chatbot_response("What's on my schedule?", [], "user1")
+            chatbot_response("What's on my schedule?", [], "user1")
+            self.assertEqual(mock_llm.invoke.call_count, 3)
+
+            # Opening messages are cached without anything student-specific, so another student hits
+            self.assertNotIn("user1", prompt_text(mock_llm.invoke.call_args_list[0]))
+            ui_history, _ = chatbot_response("I'm stressed about exams", [], "user2")
+            self.assertEqual(ui_history[-1]["content"], "Exams are tough. Try short study blocks.")
+            self.assertEqual((mock_llm.invoke.call_count, cache.stats()["hits"]), (3, 2))
+
+            # Replies that depend on the conversation so far, or on a different major, are not shared
+            chatbot_response("I'm stressed about exams", [("Hi", "Hello!")], "user1")
+            update_user_data("user2", "major", "Nursing")
+            chatbot_response("I'm stressed about exams", [], "user2")
+            self.assertEqual(mock_llm.invoke.call_count, 5)
+
+    @patch("chatbot.retrieve_passages", return_value=["CBT helps reframe anxious thoughts."])
+    @patch("chatbot.load_llm")
+    def test_chatbot_response_includes_passages(self, mock_load_llm, mock_retrieve):
+        mock_llm = MagicMock()
+        mock_response = MagicMock()
+        mock_response.content = "CBT might help."
+        mock_llm.invoke.return_value = mock_response
+        mock_load_llm.return_value = mock_llm
+
+        chatbot_response("What is CBT?", [], "user1")
+        prompt_str = prompt_text(mock_llm.invoke.call_args)
+        self.assertIn("Relevant knowledge base passages", prompt_str)
+        self.assertIn("CBT helps reframe anxious thoughts.", prompt_str)
+
+    @patch("chatbot.load_llm")
+    def test_chatbot_response_records_stage_metrics(self, mock_load_llm):
+        mock_llm = MagicMock()
+        mock_response = MagicMock()
+        mock_response.content = "Let's take it one step at a time."
+        mock_response.usage_metadata = {"input_tokens": 120, "output_tokens": 9}
+        mock_llm.invoke.return_value = mock_response
+        mock_load_llm.return_value = mock_llm
+
+        metrics.reset()
+        chatbot_response("I'm stressed", [], "user1")
+        text = metrics.render_prometheus()
+        for stage in ("profile_load", "sentiment", "prompt_build", "llm_call", "ui_history"):
+            self.assertRegex(text, f'chatbot_stage_seconds_count{{stage="{stage}"}} [1-9]')
+        self.assertIn("chatbot_turn_seconds_count 1", text)
+        self.assertIn('chatbot_llm_tokens_total{kind="input"} 120', text)
+        self.assertIn('chatbot_llm_tokens_total{kind="output"} 9', text)
+
+    @patch("chatbot.load_llm")
+    def test_failed_turns_are_still_recorded(self, mock_load_llm):
+        mock_llm = MagicMock()
+        mock_llm.stream.side_effect = ValueError("bad request")
+        mock_llm.ainvoke.side_effect = ValueError("bad request")
+        mock_load_llm.return_value = mock_llm
+
+        metrics.reset()
+        with self.assertRaises(ValueError):
+            list(chatbot_response_stream("Hi", [], "user1"))
+        with self.assertRaises(ValueError):
+            asyncio.run(chatbot_response_async("Hi", [], "user1"))
+        self.assertIn("chatbot_turn_seconds_count 2", metrics.render_prometheus())
+
+    @patch("chatbot.load_llm")
+    def test_session_response_astream(self, mock_load_llm):
+        mock_load_llm.return_value = StubLLM()
+
+        async def run(message):
+            updates = [update async for update in session_response_astream(message, "session1", "user1")]
+            return updates[-1]
+
+        ui_history, session_id = asyncio.run(run("Hi"))
+        self.assertEqual(session_id, "session1")
+        ui_history, _ = asyncio.run(run("I'm stressed"))
+        session = get_session("session1", "user1")
+        self.assertIs(ui_history, session.ui_history)  # Appended in place each turn
+        self.assertEqual(len(session), 2)
+        self.assertEqual(ui_history[-1], {"role": "assistant", "content": StubLLM.DEFAULT_REPLY})
+        flush_post_conversation()
+        self.assertNotIn("last_emotion", load_user_data()["user1"])
+
+        with patch("chatbot.generate_summary", return_value="Talked about stress."):
+            persist_session_summary(session)
+            flush_post_conversation()
+        self.assertEqual(load_user_data()["user1"]["last_conversation"], "Talked about stress.")
+        self.assertEqual(load_user_data()["user1"]["last_emotion"], "frustrated")  # Written once, when the session ends
+
+        # A turn that fails leaves no empty reply behind in the session's UI history
+        with patch("chatbot.build_messages", side_effect=ValueError("bad request")):
+            with self.assertRaises(ValueError):
+                asyncio.run(run("Still there?"))
+        self.assertEqual(len(session.ui_history), 4)
+        end_session("session1")
+
+    @patch("chatbot.load_llm", return_value=StubLLM())
+    def test_shared_session_store_is_used_off_the_event_loop(self, mock_load_llm):
+        tmp_dir = tempfile.mkdtemp()
+        store = SqliteSessionStore(os.path.join(tmp_dir, "shared_state.sqlite3"))
+        threads = []
+        get, touch = store.get, store.touch
+        store.get = lambda *args: threads.append(threading.current_thread()) or get(*args)
+        store.touch = lambda *args: threads.append(threading.current_thread()) or touch(*args)
+
+        async def run():
+            return [update async for update in session_response_astream("Hi", "shared1", "user1")]
+
+        with patch("chatbot._sessions", store):
+            asyncio.run(run())
+        store.close()
+        shutil.rmtree(tmp_dir)
+        self.assertEqual(len(threads), 2)
+        self.assertNotIn(threading.main_thread(), threads)
+
+    @patch("chatbot.load_llm")
+    def test_post_conversation_tracks_emotion(self, mock_load_llm):
+        mock_load_llm.return_value = StubLLM()
+        chatbot_response("I'm so sad and hopeless", [], "user1")
+        chatbot_response("Had a great day, I love it!", [], "user1")
+        self.assertNotIn("last_emotion", load_user_data().get("user1", {}))  # Nothing written on the turn itself
+        flush_post_conversation()
+        profile = load_user_data()["user1"]
+        self.assertEqual(profile["emotion_trend"], ["sad", "excited"])
+        self.assertEqual(profile["last_emotion"], "excited")
+
+    @patch("chatbot.load_llm")
+    def test_summarize_conversations_batches_into_one_call(self, mock_load_llm):
+        mock_llm = MagicMock()
+        mock_response = MagicMock()
+        mock_response.content = '["Talked about exams.", "Planned study time."]'
+        mock_llm.invoke.return_value = mock_response
+        mock_load_llm.return_value = mock_llm
+        summaries = summarize_conversations([["User: exams"], ["User: study plan"]])
+        self.assertEqual(summaries, ["Talked about exams.", "Planned study time."])
+        mock_llm.invoke.assert_called_once()
+
+        # A reply that is not one summary per conversation falls back to one call each
+        mock_response.content = "Both went well."
+        self.assertEqual(summarize_conversations([["a"], ["b"]]), ["Both went well.", "Both went well."])
+        self.assertEqual(mock_llm.invoke.call_count, 4)
+
+    @patch("chatbot.load_llm")
+    def test_chatbot_response_sends_chat_messages(self, mock_load_llm):
+        mock_llm = MagicMock()
+        mock_response = MagicMock()
+        mock_response.content = "Let's plan it together."
+        mock_llm.invoke.return_value = mock_response
+        mock_load_llm.return_value = mock_llm
+        update_user_data("user1", "major", "CS")
+
+        history = []
+        chatbot_response("I'm worried about my schedule", history, "user1")
+        first = mock_llm.invoke.call_args.args[0]
+        chatbot_response("Thanks", history, "user1")
+        second = mock_llm.invoke.call_args.args[0]
+
+        self.assertEqual([role for role, _ in first], ["system", "system", "user"])
+        self.assertIn("Upcoming deadlines", first[1][1])  # Per-turn notes come after the stable prefix
+        self.assertIs(second[0][1], first[0][1])  # Same cached system prefix for the whole conversation
+        self.assertEqual(second[1:], [("user", "I'm worried about my schedule"), ("assistant", "Let's plan it together."), ("user", "Thanks")])
+
+        # Profile changes wait for the next conversation, so the prefix stays cacheable
+        update_user_data("user1", "major", "Math")
+        chatbot_response("And exams?", history, "user1")
+        self.assertIs(mock_llm.invoke.call_args.args[0][0][1], first[0][1])
+        chatbot_response("Hi", [], "user1")
+        self.assertIn("studying Math", mock_llm.invoke.call_args.args[0][0][1])
+
+    @patch("chatbot.LLM_MAX_RETRIES", 1)
+    @patch("chatbot.LLM_RETRY_BASE_DELAY", 0.001)
+    @patch("chatbot.load_llm")
+    def test_chatbot_response_degrades_when_llm_unavailable(self, mock_load_llm):
+        class RateLimitError(Exception):
+            pass
+
+        mock_llm = MagicMock()
+        mock_llm.invoke.side_effect = RateLimitError("429")
+        mock_load_llm.return_value = mock_llm
+        update_user_data("user1", "university", "Centennial College")
+        ui_history, history = chatbot_response("I feel so sad and alone", [], "user1")
+        reply = history[-1][1]
+        self.assertTrue(reply.startswith(DEGRADED_REPLY))
+        self.assertIn("centennialcollege.ca", reply)  # Resources still reach a student in distress
+        self.assertEqual(mock_llm.invoke.call_count, 2)  # First attempt plus one retry
+        self.assertRegex(metrics.render_prometheus(), r'chatbot_llm_degraded_total\{reason="retries_exhausted"\} 1')
+
+    def test_turn_priority(self):
+        self.assertLess(turn_priority({"sentiment": "sad"}), turn_priority({"sentiment": "neutral"}))
+        self.assertEqual(turn_priority({"sentiment": "neutral", "resource_info": "..."}), turn_priority({"sentiment": "frustrated"}))
+
+    def test_import_skips_heavy_dependencies(self):
+        # UI, LLM client and VADER load on first use, not on `import chatbot`
+        probe = "import sys, chatbot; print(sorted(m for m in ('gradio', 'langchain_groq', 'vaderSentiment') if m in sys.modules))"
+        root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+        output = subprocess.run([sys.executable, "-c", probe], cwd=root, capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), "[]")
+
     def test_setup_profile(self):
         status, user_id = setup_profile("test_user", "Computer Science", "3", "exams", "Centennial College")
         data = load_user_data()
@@ -0,0 +1,80 @@
+import os
+import sys
+import unittest
+
+# Add the project's root directory to sys.path so we can import the main module.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from conversation_context import ConversationContext, estimate_tokens
+
+class TestConversationContextUnit(unittest.TestCase):
+    def setUp(self):
+        self.summaries = []
+        self.saved = {}
+        self.context = ConversationContext(
+            summarize=self.fake_summarize,
+            max_turns=2,
+            token_budget=1000,
+            on_summary=lambda key, summary: self.saved.__setitem__(key, summary),
+        )
+
+    def fake_summarize(self, lines):
+        # Record what was folded and return a predictable summary
+        self.summaries.append(lines)
+        return f"summary of {len(lines)} lines"
+
+    def test_short_history_is_sent_verbatim(self):
+        history = [("Hi", "Hello!")]
+        self.assertEqual(self.context.window("user1", history), (None, history))
+        self.assertEqual(self.summaries, [])
+
+    def test_old_turns_are_folded_in_chunks(self):
+        history = [(f"q{i}", f"a{i}") for i in range(4)]
+        self.assertEqual(self.context.window("user1", history), (None, history))  # Up to 2 * max_turns verbatim
+
+        history.append(("q4", "a4"))
+        summary, recent = self.context.window("user1", history)
+        self.assertEqual(recent, history[3:])
+        self.assertEqual(summary, "summary of 3 lines")
+        self.assertEqual(self.saved["user1"], summary)
+
+        # The window grows again before the next fold, which builds on the old summary
+        for i in range(5, 7):
+            history.append((f"q{i}", f"a{i}"))
+            self.assertEqual(self.context.window("user1", history), (summary, history[3:]))
+        self.assertEqual(len(self.summaries), 1)
+        history.append(("q7", "a7"))
+        summary, recent = self.context.window("user1", history)
+        self.assertEqual(recent, history[6:])
+        self.assertEqual(self.summaries[-1], [
+            "Earlier summary: summary of 3 lines",
+            "User: q3\nAssistant: a3",
+            "User: q4\nAssistant: a4",
+            "User: q5\nAssistant: a5",
+        ])
+
+    def test_state_is_bounded_per_key(self):
+        context = ConversationContext(summarize=self.fake_summarize, max_turns=1, max_keys=2)
+        history = [(f"q{i}", f"a{i}") for i in range(3)]
+        for key in ("s1", "s2", "s3"):
+            context.window(key, history)
+        self.assertEqual(list(context._folded), ["s2", "s3"])
+        context.forget("s2")
+        self.assertEqual(list(context._folded), ["s3"])
+
+    def test_token_budget_trims_verbatim_turns(self):
+        context = ConversationContext(summarize=self.fake_summarize, max_turns=10, token_budget=20)
+        long_text = "x" * 80  # ~21 tokens
+        history = [("q0", long_text), ("q1", long_text), ("q2", "short")]
+        summary, recent = context.window("user1", history)
+        self.assertEqual(recent, history[2:])
+        self.assertLessEqual(sum(estimate_tokens(u) + estimate_tokens(b) for u, b in recent), 20)
+        self.assertIsNotNone(summary)
+
+    def test_cleared_chat_starts_fresh(self):
+        self.context.window("user1", [(f"q{i}", f"a{i}") for i in range(4)])
+        new_history = [("new", "chat"), ("q", "a")]
+        self.assertEqual(self.context.window("user1", new_history), (None, new_history))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import os
+import sys
+import time
+import unittest
+from datetime import date, timedelta
+
+# Add the project's root directory to sys.path so we can import the main module.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from deadlines import DeadlineIndex, ReminderScheduler
+
+class TestDeadlinesUnit(unittest.TestCase):
+    def setUp(self):
+        self.today = date(2025, 4, 1)
+        self.index = DeadlineIndex()
+        self.deadlines = {
+            "Project": "2025-04-06",
+            "Exam": "2025-04-03",
+            "Assignment": "2025-04-01",
+            "Overdue lab": "2025-03-30",
+        }
+
+    def test_upcoming_sorted_and_includes_overdue(self):
+        upcoming = self.index.upcoming("user1", self.deadlines, self.today + timedelta(days=3))
+        self.assertEqual(upcoming, ["Overdue lab", "Assignment", "Exam"])
+
+    def test_upcoming_reparses_only_changed_deadlines(self):
+        self.index.upcoming("user1", self.deadlines, self.today)
+        self.deadlines["Exam"] = "2025-03-31"
+        self.assertIn("Exam", self.index.upcoming("user1", self.deadlines, self.today))
+
+    def test_pop_due_returns_each_deadline_once(self):
+        self.index.rebuild([("user1", self.deadlines), ("user2", {"Essay": "2025-05-01"}), ("user3", {})])
+        due = self.index.pop_due(self.today + timedelta(days=3))
+        self.assertEqual(due, {"user1": ["Overdue lab", "Assignment", "Exam"]})
+        self.assertEqual(self.index.pop_due(self.today + timedelta(days=3)), {})
+        self.assertEqual(self.index.pop_due(date(2025, 5, 1)), {"user1": ["Project"], "user2": ["Essay"]})
+
+    def test_pop_due_skips_edited_deadlines(self):
+        self.index.update("user1", {"Exam": "2025-04-02"})
+        self.index.update("user1", {"Exam": "2025-04-20"})  # Exam was postponed
+        self.assertEqual(self.index.pop_due(self.today + timedelta(days=3)), {})
+        self.assertEqual(self.index.pop_due(date(2025, 4, 20)), {"user1": ["Exam"]})
+
+    def test_reindexing_does_not_repeat_reminders(self):
+        self.index.update("user1", {"Exam": "2025-04-02"})
+        self.assertEqual(self.index.pop_due(self.today), {})
+        self.assertEqual(self.index.pop_due(self.today + timedelta(days=3)), {"user1": ["Exam"]})
+        self.index.rebuild([("user1", {"Exam": "2025-04-02", "Essay": "2025-04-03"})])
+        self.index.update("user1", {"Exam": "2025-04-02", "Essay": "2025-04-03"})
+        self.assertEqual(self.index.pop_due(self.today + timedelta(days=3)), {"user1": ["Essay"]})
+        self.index.update("user1", {"Exam": "2025-04-04"})  # Moved, so it is reminded about again
+        self.assertEqual(self.index.pop_due(self.today + timedelta(days=3)), {"user1": ["Exam"]})
+
+    def test_scheduler_run_once_delivers(self):
+        delivered = []
+        self.index.rebuild([("user1", self.deadlines)])
+        scheduler = ReminderScheduler(self.index, lambda user_id, tasks: delivered.append((user_id, tasks)))
+        scheduler.run_once(today=self.today)
+        self.assertEqual(delivered, [("user1", ["Overdue lab", "Assignment", "Exam"])])
+
+    def test_scheduler_refreshes_before_each_sweep(self):
+        delivered = []
+        # Stands in for deadlines another process wrote to the store
+        refresh = lambda: self.index.update("user2", {"Essay": "2025-04-02"})
+        scheduler = ReminderScheduler(self.index, lambda user_id, tasks: delivered.append((user_id, tasks)), refresh=refresh)
+        scheduler.run_once(today=self.today)
+        scheduler.run_once(today=self.today)
+        self.assertEqual(delivered, [("user2", ["Essay"])])
+
+    def test_bad_dates_are_skipped(self):
+        with self.assertLogs("deadlines", "WARNING"):
+            upcoming = self.index.upcoming("user1", {"Exam": "2025-04-02", "Quiz": "next friday"}, self.today + timedelta(days=3))
+        self.assertEqual(upcoming, ["Exam"])
+
+    def test_scheduler_survives_failures(self):
+        delivered = []
+
+        def deliver(user_id, tasks):
+            if not delivered:
+                delivered.append(None)
+                raise TimeoutError("database is locked")
+            delivered.append((user_id, tasks))
+
+        self.index.update("user1", {"Exam": "2025-04-02"})
+        scheduler = ReminderScheduler(self.index, deliver)
+        with self.assertLogs("deadlines", "ERROR"):
+            scheduler.run_once(today=self.today)
+        scheduler.run_once(today=self.today)  # The failed reminder is delivered on the next sweep
+        self.assertEqual(delivered, [None, ("user1", ["Exam"])])
+
+        # An error outside delivery (e.g. refreshing from the store) is logged and the thread keeps going
+        refreshes = []
+        failing = ReminderScheduler(self.index, deliver, interval=0.01, refresh=lambda: refreshes.append(1) / 0)
+        with self.assertLogs("deadlines", "ERROR"):
+            failing.start()
+            deadline = time.time() + 5
+            while len(refreshes) < 2 and time.time() < deadline:
+                time.sleep(0.01)
+        failing.stop()
+        self.assertGreaterEqual(len(refreshes), 2)
+
+if __name__ == "__main__":
+    unittest.main()
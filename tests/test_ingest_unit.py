@@ -0,0 +1,45 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+# Add the project's root directory to sys.path so we can import the main module.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ingest import chunk_text, plan_ingest, batched, file_hash, load_manifest, save_manifest
+
+class TestIngestUnit(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_chunk_text_overlaps_and_covers_text(self):
+        text = " ".join(f"word{i}" for i in range(400))
+        chunks = chunk_text(text, size=100, overlap=20)
+        self.assertTrue(all(len(chunk) <= 100 for chunk in chunks))
+        self.assertEqual(chunks[0][80:], chunks[1][:20])  # Neighbours share the overlap
+        self.assertTrue(text.endswith(chunks[-1]))
+        self.assertEqual(chunk_text("   \n "), [])
+
+    def test_plan_ingest_detects_changes(self):
+        manifest = {"a.pdf": "hash-a", "b.pdf": "hash-b", "gone.pdf": "hash-gone"}
+        current = {"a.pdf": "hash-a", "b.pdf": "hash-b2", "new.pdf": "hash-new"}
+        self.assertEqual(plan_ingest(current, manifest), (["b.pdf", "new.pdf"], ["gone.pdf"]))
+        self.assertEqual(plan_ingest(current, manifest, force=True)[0], ["a.pdf", "b.pdf", "new.pdf"])
+
+    def test_batched(self):
+        self.assertEqual(list(batched(range(5), 2)), [[0, 1], [2, 3], [4]])
+
+    def test_manifest_round_trip_and_hash(self):
+        path = os.path.join(self.tmp_dir, "doc.pdf")
+        with open(path, "wb") as file:
+            file.write(b"%PDF-1.4 test")
+        self.assertEqual(load_manifest(self.tmp_dir), {})
+        save_manifest(self.tmp_dir, {"doc.pdf": file_hash(path)})
+        self.assertEqual(load_manifest(self.tmp_dir), {"doc.pdf": file_hash(path)})
+
+if __name__ == "__main__":
+    unittest.main()
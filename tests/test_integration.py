@@ -16,6 +16,8 @@ from chatbot import (
 
 # ... (imports & setup remain the same)
 
+@unittest.skipUnless(os.environ.get("GROQ_API_KEY") or os.environ.get("LLM_BACKEND", "groq") != "groq",
+                     "needs GROQ_API_KEY (or LLM_BACKEND=stub)")
 class TestChatbotIntegration(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
@@ -0,0 +1,61 @@
+import os
+import sys
+import asyncio
+import unittest
+
+# Add the project's root directory to sys.path so we can import the main module.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from launcher import StickyProxy, worker_env
+
+class TestLauncherUnit(unittest.TestCase):
+    def test_worker_env_shares_state(self):
+        env = worker_env(2, 4, 7863, "shared.sqlite3", base_env={"RESPONSE_CACHE": "memory", "METRICS_PORT": "9100", "LLM_MAX_CONCURRENCY": "8"})
+        self.assertEqual(env["CHATBOT_WORKER_ID"], "2")
+        self.assertEqual(env["GRADIO_SERVER_PORT"], "7863")
+        self.assertEqual(env["SHARED_STATE_DB"], "shared.sqlite3")
+        self.assertEqual(env["PROFILE_STORE_BACKEND"], "sqlite")
+        self.assertEqual(env["RESPONSE_CACHE"], "disk")
+        self.assertEqual(env["METRICS_PORT"], "9102")
+        self.assertEqual(env["LLM_MAX_CONCURRENCY"], "2")
+        self.assertEqual(worker_env(0, 1, 7861, "s", base_env={"METRICS_PORT": "0"})["METRICS_PORT"], "0")
+
+    def test_proxy_is_sticky_and_fails_over(self):
+        async def scenario():
+            async def worker(name, reader, writer):
+                request = await reader.read(100)
+                writer.write(name + b":" + request)
+                await writer.drain()
+                writer.close()
+
+            servers = [await asyncio.start_server(lambda r, w, name=name: worker(name, r, w), "127.0.0.1", 0) for name in (b"a", b"b")]
+            backends = [("127.0.0.1", server.sockets[0].getsockname()[1]) for server in servers]
+            proxy = StickyProxy(backends)
+            front = await asyncio.start_server(proxy.handle, "127.0.0.1", 0)
+            port = front.sockets[0].getsockname()[1]
+
+            async def request():
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.write(b"ping")
+                writer.write_eof()
+                reply = await reader.read()
+                writer.close()
+                return reply
+
+            first = await request()
+            self.assertEqual(await request(), first)  # Same client, same worker
+            self.assertEqual(first.split(b":")[1], b"ping")
+
+            # The chosen worker goes away; the client is served by the other one
+            chosen = proxy.order("127.0.0.1")[0]
+            servers[backends.index(chosen)].close()
+            await servers[backends.index(chosen)].wait_closed()
+            self.assertNotEqual(await request(), first)
+            front.close()
+            for server in servers:
+                server.close()
+
+        asyncio.run(scenario())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import os
+import sys
+import asyncio
+import unittest
+from unittest.mock import patch
+
+# Add the project's root directory to sys.path so we can import the main module.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from llm_client import LLMConfig, LLMClientRegistry, StubLLM, create_llm_backend
+
+class TestLLMClientUnit(unittest.TestCase):
+    def test_config_from_env(self):
+        env = {"GROQ_MODEL_NAME": "llama-3.1-8b-instant", "GROQ_TEMPERATURE": "0.2", "LLM_MAX_CONCURRENCY": "3"}
+        with patch.dict(os.environ, env):
+            config = LLMConfig.from_env()
+        self.assertEqual(config.model_name, "llama-3.1-8b-instant")
+        self.assertEqual(config.temperature, 0.2)
+        self.assertEqual(config.max_concurrency, 3)
+
+    def test_config_repr_hides_api_key(self):
+        self.assertNotIn("secret", repr(LLMConfig(api_key="secret")))
+
+    def test_registry_builds_each_config_once(self):
+        built = []
+        registry = LLMClientRegistry(lambda config: built.append(config) or object())
+        config = LLMConfig(backend="stub")
+        first = registry.get(config)
+        self.assertIs(registry.get(config), first)
+        self.assertEqual(len(built), 1)
+        registry.clear()
+        self.assertIsNot(registry.get(config), first)
+
+    def test_stub_backend(self):
+        llm = create_llm_backend(LLMConfig(backend="stub"))
+        self.assertIsInstance(llm, StubLLM)
+        reply = llm.invoke("User: hi").content
+        self.assertEqual("".join(chunk.content for chunk in llm.stream("User: hi")).strip(), reply)
+        self.assertEqual(asyncio.run(llm.ainvoke("User: hi")).content, reply)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            create_llm_backend(LLMConfig(backend="nope"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import asyncio
+import threading
+import unittest
+
+# Add the project's root directory to sys.path so we can import the main module.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from llm_dispatch import (
+    LLMDispatcher,
+    LLMUnavailable,
+    TokenBucket,
+    SqliteTokenBucket,
+    is_retryable,
+    PRIORITY_DISTRESS,
+    PRIORITY_NORMAL,
+    PRIORITY_BACKGROUND,
+)
+
+class RateLimitError(Exception):
+    pass
+
+class FakeStatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(status_code)
+        self.status_code = status_code
+
+class TestLLMDispatchUnit(unittest.TestCase):
+    def test_token_bucket_spaces_requests_after_burst(self):
+        bucket = TokenBucket(rate=10, burst=2)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertAlmostEqual(bucket.reserve(), 0.1, delta=0.02)
+        self.assertAlmostEqual(bucket.reserve(), 0.2, delta=0.02)
+        self.assertEqual(TokenBucket(rate=0).reserve(), 0.0)
+
+    def test_sqlite_token_bucket_is_shared(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp_dir, "shared_state.sqlite3")
+            worker_a = SqliteTokenBucket(path, rate=10, burst=2)
+            worker_b = SqliteTokenBucket(path, rate=10, burst=2)
+            self.assertEqual(worker_a.reserve(), 0.0)
+            self.assertEqual(worker_b.reserve(), 0.0)
+            self.assertAlmostEqual(worker_a.reserve(), 0.1, delta=0.02)  # The burst was used up by both
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_async_calls_reserve_shared_tokens_off_the_event_loop(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            bucket = SqliteTokenBucket(os.path.join(tmp_dir, "shared_state.sqlite3"), rate=1000, burst=5)
+            threads = []
+            reserve = bucket.reserve
+            bucket.reserve = lambda: threads.append(threading.current_thread()) or reserve()
+            dispatcher = LLMDispatcher(bucket=bucket)
+            self.assertEqual(asyncio.run(dispatcher.acall(lambda: asyncio.sleep(0, "ok"))), "ok")
+            self.assertEqual(len(threads), 1)
+            self.assertIsNot(threads[0], threading.main_thread())
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_is_retryable(self):
+        self.assertTrue(is_retryable(RateLimitError()))
+        self.assertTrue(is_retryable(FakeStatusError(429)))
+        self.assertTrue(is_retryable(FakeStatusError(503)))
+        self.assertFalse(is_retryable(FakeStatusError(401)))
+        self.assertFalse(is_retryable(ValueError("bad prompt")))
+
+    def test_call_retries_then_gives_up(self):
+        dispatcher = LLMDispatcher(max_retries=2, base_delay=0.001, max_delay=0.001)
+        attempts = []
+
+        def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise RateLimitError()
+            return "ok"
+
+        self.assertEqual(dispatcher.call(flaky), "ok")
+        self.assertEqual(len(attempts), 3)
+
+        def always_limited():
+            raise RateLimitError()
+
+        with self.assertRaises(LLMUnavailable) as raised:
+            dispatcher.call(always_limited)
+        self.assertEqual(raised.exception.reason, "retries_exhausted")
+
+        # Errors a retry cannot fix surface unchanged
+        with self.assertRaises(ValueError):
+            dispatcher.call(lambda: (_ for _ in ()).throw(ValueError("bad prompt")))
+        self.assertEqual(dispatcher.stats(), {"in_flight": 0, "queued": 0})
+
+    def test_stream_does_not_retry_after_first_chunk(self):
+        dispatcher = LLMDispatcher(max_retries=3, base_delay=0.001, max_delay=0.001)
+        calls = []
+
+        def broken_stream():
+            calls.append(1)
+            yield "Hello"
+            raise RateLimitError()
+
+        chunks = []
+        with self.assertRaises(RateLimitError):
+            for chunk in dispatcher.stream(broken_stream):
+                chunks.append(chunk)
+        self.assertEqual((chunks, len(calls)), (["Hello"], 1))
+
+    def test_queue_serves_distress_first(self):
+        dispatcher = LLMDispatcher(max_concurrency=1, max_queue=10, queue_timeout=5)
+        order = []
+        release = threading.Event()
+        holder = threading.Thread(target=dispatcher.call, args=(release.wait,))
+        holder.start()
+        while dispatcher.stats()["in_flight"] == 0:
+            time.sleep(0.001)
+
+        threads = []
+        for name, priority in [("background", PRIORITY_BACKGROUND), ("normal", PRIORITY_NORMAL), ("distress", PRIORITY_DISTRESS)]:
+            thread = threading.Thread(target=dispatcher.call, args=(lambda name=name: order.append(name), priority))
+            thread.start()
+            threads.append(thread)
+            while dispatcher.stats()["queued"] < len(threads):
+                time.sleep(0.001)
+
+        release.set()
+        for thread in [holder] + threads:
+            thread.join()
+        self.assertEqual(order, ["distress", "normal", "background"])
+
+    def test_full_queue_rejects_lowest_priority(self):
+        async def scenario():
+            dispatcher = LLMDispatcher(max_concurrency=1, max_queue=1, queue_timeout=5)
+            release = asyncio.Event()
+            holder = asyncio.create_task(dispatcher.acall(release.wait))
+            await asyncio.sleep(0)
+            waiting = asyncio.create_task(dispatcher.acall(lambda: asyncio.sleep(0, "normal"), PRIORITY_NORMAL))
+            await asyncio.sleep(0)
+
+            # Another normal turn is turned away at once; a distress turn takes the queued turn's place
+            with self.assertRaises(LLMUnavailable):
+                await dispatcher.acall(lambda: asyncio.sleep(0, "late"), PRIORITY_NORMAL)
+            distress = asyncio.create_task(dispatcher.acall(lambda: asyncio.sleep(0, "distress"), PRIORITY_DISTRESS))
+            await asyncio.sleep(0)
+            release.set()
+            results = await asyncio.gather(holder, waiting, distress, return_exceptions=True)
+            self.assertIsInstance(results[1], LLMUnavailable)
+            self.assertEqual(results[2], "distress")
+            self.assertEqual(dispatcher.stats(), {"in_flight": 0, "queued": 0})
+
+        asyncio.run(scenario())
+
+    def test_queue_timeout(self):
+        dispatcher = LLMDispatcher(max_concurrency=1, queue_timeout=0.05)
+        with dispatcher.admit():
+            with self.assertRaises(LLMUnavailable) as raised:
+                dispatcher.call(lambda: "never")
+        self.assertEqual(raised.exception.reason, "queue_timeout")
+        self.assertEqual(dispatcher.call(lambda: "ok"), "ok")  # The abandoned waiter does not hold the slot
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import sys
+import json
+import unittest
+import urllib.request
+
+# Add the project's root directory to sys.path so we can import the main module.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from metrics import MetricsRegistry, Histogram, start_metrics_server
+
+class TestMetricsUnit(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_histogram_buckets(self):
+        histogram = Histogram((1, 5))
+        for value in (0.5, 1, 3, 10):
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [2, 1, 1])
+        self.assertEqual(histogram.sum, 14.5)
+
+    def test_render_prometheus(self):
+        self.registry.observe("chatbot_prompt_chars", 300, buckets=(250, 500))
+        self.registry.inc("chatbot_response_cache_total", result="hit")
+        self.registry.gauge("chatbot_cache_entries", lambda: {(): 4}, "Cached replies")
+        text = self.registry.render_prometheus()
+        self.assertIn("# TYPE chatbot_prompt_chars histogram", text)
+        self.assertIn('chatbot_prompt_chars_bucket{le="250"} 0', text)
+        self.assertIn('chatbot_prompt_chars_bucket{le="500"} 1', text)
+        self.assertIn('chatbot_prompt_chars_bucket{le="+Inf"} 1', text)
+        self.assertIn('chatbot_response_cache_total{result="hit"} 1', text)
+        self.assertIn("# HELP chatbot_cache_entries Cached replies", text)
+        self.assertIn("chatbot_cache_entries 4", text)
+
+    def test_turn_collects_spans_and_counters(self):
+        with self.registry.turn(user_id="user1") as trace:
+            with self.registry.span("sentiment"):
+                pass
+            self.registry.inc("chatbot_response_cache_total", result="miss")
+        record = trace.as_dict()
+        self.assertEqual(record["user_id"], "user1")
+        self.assertIn("sentiment", record["stages_ms"])
+        self.assertEqual(record["chatbot_response_cache_total_miss"], 1)
+        json.dumps(record)  # Must be loggable as one JSON line
+
+        # Spans outside a turn still feed the histograms
+        @self.registry.span("profile_load")
+        def load():
+            return "profile"
+        self.assertEqual(load(), "profile")
+        self.assertIn('chatbot_stage_seconds_count{stage="profile_load"} 1', self.registry.render_prometheus())
+
+    def test_metrics_endpoint(self):
+        self.registry.inc("chatbot_turns_total")
+        server = start_metrics_server(self.registry, 0, host="127.0.0.1")
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            body = urllib.request.urlopen(url, timeout=5).read().decode("utf-8")
+            self.assertIn("chatbot_turns_total 1", body)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+if __name__ == "__main__":
+    unittest.main()
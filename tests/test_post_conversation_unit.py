@@ -0,0 +1,98 @@
+import os
+import sys
+import time
+import unittest
+
+# Add the project's root directory to sys.path so we can import the main module.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from post_conversation import PostConversationWorker
+from profile_store import merge_fields
+
+class TestPostConversationUnit(unittest.TestCase):
+    def setUp(self):
+        self.profiles = {"user1": {"emotion_trend": ["neutral"] * 9}}
+        self.writes = []
+        self.summary_calls = []
+
+        def write_many(items):
+            # Stands in for a profile store: callable values see the stored value
+            self.writes.append(items)
+            for user_id, fields in items:
+                merge_fields(self.profiles.setdefault(user_id, {}), fields)
+
+        def summarize_many(conversations):
+            self.summary_calls.append(conversations)
+            return [f"summary of {lines[0]}" for lines in conversations]
+
+        self.worker = PostConversationWorker(
+            summarize_many=summarize_many,
+            write_many=write_many,
+            batch_size=2,
+            max_delay=0.01,
+        )
+
+    def test_batch_is_written_once(self):
+        self.worker.submit_turn("user1", "sad")
+        self.worker.submit_turn("user1", "happy")
+        self.worker.submit_turn("user2", "neutral")
+        self.worker.submit_fields("user2", {"last_conversation": "folded"})
+        for n in range(3):
+            self.worker.submit_session(f"user{n + 3}", [f"chat {n}"])
+        self.worker.submit_session("user9", [])  # Nothing to summarize
+
+        written = self.worker.flush()
+        self.assertEqual(len(self.writes), 1)
+        self.assertEqual(self.profiles["user1"]["last_emotion"], "happy")
+        self.assertEqual(self.profiles["user1"]["emotion_trend"], ["neutral"] * 8 + ["sad", "happy"])
+        self.assertEqual(self.profiles["user2"], {"last_conversation": "folded", "last_emotion": "neutral", "emotion_trend": ["neutral"]})
+        self.assertEqual(written["user5"], {"last_conversation": "summary of chat 2"})
+        self.assertEqual([len(call) for call in self.summary_calls], [2, 1])
+        self.assertNotIn("user9", written)
+        self.assertEqual(self.worker.flush(), {})
+
+    def test_failed_summaries_do_not_drop_other_fields(self):
+        def summarize_many(conversations):
+            if conversations[0] == ["chat 0"]:
+                raise RuntimeError("LLM unavailable")
+            return [f"summary of {lines[0]}" for lines in conversations]
+
+        self.worker._summarize_many = summarize_many
+        self.worker.submit_turn("user1", "sad")
+        self.worker.submit_fields("user2", {"resolved_university": {"name": "UofT", "canonical": "University of Toronto"}})
+        for n in range(3):
+            self.worker.submit_session(f"user{n + 3}", [f"chat {n}"])
+        with self.assertLogs("post_conversation", "ERROR"):
+            self.worker.flush()
+        self.assertEqual(self.profiles["user1"]["last_emotion"], "sad")
+        self.assertIn("resolved_university", self.profiles["user2"])
+        self.assertNotIn("user3", self.profiles)  # Its batch failed
+        self.assertEqual(self.profiles["user5"], {"last_conversation": "summary of chat 2"})
+
+    def test_background_thread_and_full_queue(self):
+        worker = PostConversationWorker(lambda conversations: [], self.worker._write_many, max_delay=0.01, max_queue=1)
+        self.profiles.clear()
+        worker.submit_turn("user1", "sad")
+        worker.submit_turn("user1", "happy")  # Queue full: dropped rather than blocking the turn
+        self.assertEqual(worker.dropped, 1)
+        worker.start()
+        deadline = time.time() + 5
+        while not self.writes and time.time() < deadline:
+            time.sleep(0.01)
+        worker.stop()
+        self.assertEqual(len(self.writes), 1)
+        self.assertEqual(self.profiles, {"user1": {"emotion_trend": ["sad"], "last_emotion": "sad"}})
+
+    def test_autostart_and_flush_include_the_threads_batch(self):
+        worker = PostConversationWorker(lambda conversations: [], self.worker._write_many, max_delay=0.2, autostart=True)
+        self.profiles.clear()
+        worker.submit_turn("user1", "sad", set_last=False)  # Mid-session: trend only
+        self.assertIsNotNone(worker._thread)
+        worker.submit_turn("user1", "happy", set_last=False)
+        worker.flush()  # Waits for the thread if it already took the jobs
+        worker.stop()
+        self.assertEqual(len(self.writes), 1)
+        self.assertEqual(self.profiles, {"user1": {"emotion_trend": ["sad", "happy"]}})
+
+if __name__ == "__main__":
+    unittest.main()
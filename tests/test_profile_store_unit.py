@@ -0,0 +1,109 @@
+import os
+import sys
+import json
+import sqlite3
+import shutil
+import tempfile
+import unittest
+
+# Add the project's root directory to sys.path so we can import the main module.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from profile_store import JsonProfileStore, SqliteProfileStore, create_profile_store
+
+class TestProfileStoreUnit(unittest.TestCase):
+    def setUp(self):
+        # Each test gets its own scratch directory for the JSON and SQLite files.
+        self.tmp_dir = tempfile.mkdtemp()
+        self.json_path = os.path.join(self.tmp_dir, "user_data.json")
+        self.db_path = os.path.join(self.tmp_dir, "user_data.sqlite3")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_json_store_partial_update(self):
+        store = JsonProfileStore(self.json_path)
+        store.update("user1", {"major": "CS"})
+        store.update("user1", {"year_of_study": "2"})
+        self.assertEqual(store.get("user1"), {"major": "CS", "year_of_study": "2"})
+        self.assertEqual(store.get("missing"), {})
+
+    def test_sqlite_store_keyed_reads_and_writes(self):
+        store = SqliteProfileStore(self.db_path)
+        store.update("user1", {"major": "CS"})
+        store.update("user1", {"university": "Centennial College"})
+        store.update("user2", {"major": "Biology"})
+        self.assertEqual(store.get("user1"), {"major": "CS", "university": "Centennial College"})
+        self.assertEqual(store.get("missing"), {})
+        self.assertEqual(set(store.load_all()), {"user1", "user2"})
+        store.close()
+
+    def test_sqlite_store_imports_json_once(self):
+        with open(self.json_path, "w") as file:
+            json.dump({"Kabir": {"major": "Software Engineering"}}, file)
+        store = SqliteProfileStore(self.db_path, import_json_path=self.json_path)
+        self.assertEqual(store.get("Kabir"), {"major": "Software Engineering"})
+        store.update("Kabir", {"major": "CS"})
+        store.close()
+
+        # Reopening must not re-import and clobber newer writes.
+        reopened = SqliteProfileStore(self.db_path, import_json_path=self.json_path)
+        self.assertEqual(reopened.get("Kabir"), {"major": "CS"})
+        reopened.close()
+
+    def test_sqlite_store_save_all_replaces_contents(self):
+        store = SqliteProfileStore(self.db_path)
+        store.update("old_user", {"major": "CS"})
+        store.save_all({"user1": {"major": "Math"}})
+        self.assertEqual(store.load_all(), {"user1": {"major": "Math"}})
+        store.close()
+
+    def test_update_many_merges_batches(self):
+        for store in (JsonProfileStore(self.json_path), SqliteProfileStore(self.db_path)):
+            store.update("user1", {"major": "CS", "last_emotion": "sad"})
+            written = store.update_many([
+                ("user1", {"major": "Math"}),
+                ("user2", {"major": "Biology"}),
+                ("user2", {"year_of_study": "3"}),
+            ])
+            self.assertEqual(written, 3)
+            self.assertEqual(store.get("user1"), {"major": "Math", "last_emotion": "sad"})
+            self.assertEqual(store.get("user2"), {"major": "Biology", "year_of_study": "3"})
+            self.assertEqual(dict(store.iter_profiles()), store.load_all())
+
+            # Callable values are applied to the stored value inside the write
+            append = lambda trend: (trend or []) + ["sad"]
+            store.update_many([("user1", {"emotion_trend": append}), ("user1", {"emotion_trend": append})])
+            store.update("user3", {"emotion_trend": append})
+            self.assertEqual(store.get("user1")["emotion_trend"], ["sad", "sad"])
+            self.assertEqual(store.get("user3"), {"emotion_trend": ["sad"]})
+
+    def test_changed_since_returns_newer_writes(self):
+        for store in (JsonProfileStore(self.json_path), SqliteProfileStore(self.db_path)):
+            self.assertEqual(store.changed_since(None), (None, []))
+            store.update("user1", {"major": "CS"})
+            store.update_many([("user2", {"major": "Math"})])
+            version, changed = store.changed_since(None)
+            self.assertEqual(dict(changed), {"user1": {"major": "CS"}, "user2": {"major": "Math"}})
+            self.assertEqual(store.changed_since(version), (version, []))
+            store.update("user1", {"year_of_study": "2"})
+            os.utime(self.json_path, ns=(1, 1))  # Coarse mtimes could make the two JSON writes look alike
+            version, changed = store.changed_since(version)
+            self.assertIn(("user1", {"major": "CS", "year_of_study": "2"}), changed)
+
+    def test_sqlite_store_adds_version_column_to_old_databases(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE profiles (user_id TEXT PRIMARY KEY, data TEXT NOT NULL)")
+        conn.execute("INSERT INTO profiles VALUES ('user1', '{}')")
+        conn.commit()
+        conn.close()
+        store = SqliteProfileStore(self.db_path)
+        self.assertEqual(store.changed_since(None)[1], [("user1", {})])
+        store.close()
+
+    def test_create_profile_store_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            create_profile_store("redis", self.json_path, self.db_path)
+
+if __name__ == "__main__":
+    unittest.main()
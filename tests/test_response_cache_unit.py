@@ -0,0 +1,51 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Add the project's root directory to sys.path so we can import the main module.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from response_cache import ResponseCache, normalize_message, make_cache_key
+
+class TestResponseCacheUnit(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_normalize_message(self):
+        self.assertEqual(normalize_message("I'm  stressed about EXAMS!!"), "im stressed about exams")
+        self.assertEqual(normalize_message("I’m stressed about exams"), "im stressed about exams")
+        self.assertEqual(make_cache_key("a", "b"), make_cache_key("a", "b"))
+        self.assertNotEqual(make_cache_key("a", "b"), make_cache_key("ab"))
+
+    def test_hits_misses_and_lru_eviction(self):
+        cache = ResponseCache(max_entries=2)
+        self.assertIsNone(cache.get("k1"))
+        cache.set("k1", "v1")
+        cache.set("k2", "v2")
+        self.assertEqual(cache.get("k1"), "v1")  # k1 is now most recently used
+        cache.set("k3", "v3")
+        self.assertIsNone(cache.get("k2"))
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 2, "entries": 2})
+
+    def test_ttl_expiry(self):
+        cache = ResponseCache(ttl=10)
+        with patch("response_cache.time.time", return_value=1000):
+            cache.set("k1", "v1")
+        with patch("response_cache.time.time", return_value=1005):
+            self.assertEqual(cache.get("k1"), "v1")
+        with patch("response_cache.time.time", return_value=1011):
+            self.assertIsNone(cache.get("k1"))
+
+    def test_disk_tier_survives_restart(self):
+        path = os.path.join(self.tmp_dir, "cache.sqlite3")
+        ResponseCache(disk_path=path).set("k1", "v1")
+        self.assertEqual(ResponseCache(disk_path=path).get("k1"), "v1")
+
+if __name__ == "__main__":
+    unittest.main()
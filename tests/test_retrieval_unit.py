@@ -0,0 +1,57 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+# Add the project's root directory to sys.path so we can import the main module.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from retrieval import VectorIndex, Retriever, write_vector_index
+
+class TestRetrievalUnit(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        rows = [
+            ([1.0, 0.0, 0.0], "Breathing exercises calm anxiety.", {"source": "a.pdf", "page": 0}),
+            ([0.0, 2.0, 0.0], "CBT challenges unhelpful thoughts.", {"source": "b.pdf", "page": 3}),
+            ([0.0, 1.0, 1.0], "Family therapy involves relatives.", {"source": "b.pdf", "page": 4}),
+        ]
+        write_vector_index(self.tmp_dir, iter(rows), len(rows))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_load_missing_index(self):
+        self.assertIsNone(VectorIndex.load(os.path.join(self.tmp_dir, "missing")))
+
+    def test_index_is_memory_mapped_and_normalized(self):
+        index = VectorIndex.load(self.tmp_dir)
+        self.assertEqual(len(index), 3)
+        self.assertIsInstance(index.embeddings, np.memmap)
+        np.testing.assert_allclose(np.linalg.norm(index.embeddings, axis=1), 1.0, rtol=1e-6)
+        self.assertEqual(index.chunk(1), {"text": "CBT challenges unhelpful thoughts.", "source": "b.pdf", "page": 3})
+
+    def test_search_returns_best_first(self):
+        index = VectorIndex.load(self.tmp_dir)
+        results = index.search(np.array([0.0, 1.0, 0.0], dtype=np.float32), k=2)
+        self.assertEqual([row for _, row in results], [1, 2])
+        self.assertAlmostEqual(results[0][0], 1.0, places=5)
+        self.assertEqual(len(index.search(np.array([1.0, 0.0, 0.0], dtype=np.float32), k=10)), 3)
+
+    def test_retriever_caches_query_embeddings_and_filters_low_scores(self):
+        calls = []
+
+        def embed(text):
+            calls.append(text)
+            return np.array([0.0, 1.0, 0.0], dtype=np.float32)
+
+        retriever = Retriever(VectorIndex.load(self.tmp_dir), embed, min_score=0.5)
+        passages = retriever.retrieve("What is CBT?", k=3)
+        self.assertEqual(passages, ["CBT challenges unhelpful thoughts.", "Family therapy involves relatives."])
+        retriever.retrieve("what is  cbt?", k=3)
+        self.assertEqual(calls, ["what is cbt?"])  # Second query hit the embedding cache
+
+if __name__ == "__main__":
+    unittest.main()
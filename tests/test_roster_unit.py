@@ -0,0 +1,93 @@
+import os
+import sys
+import io
+import json
+import shutil
+import tempfile
+import unittest
+from datetime import date
+
+# Add the project's root directory to sys.path so we can import the main module.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from profile_store import SqliteProfileStore
+from deadlines import DeadlineIndex
+from roster import validate_profile, import_roster, export_profiles, RosterError
+
+class TestRosterUnit(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.store = SqliteProfileStore(os.path.join(self.tmp_dir, "user_data.sqlite3"))
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, "w") as file:
+            file.write(text)
+        return path
+
+    def test_validate_profile(self):
+        user_id, fields = validate_profile({"user_id": " ana ", "major": "CS", "university": "", "deadlines": "Exam=2025-04-10; Essay=2025-04-20"})
+        self.assertEqual(user_id, "ana")
+        self.assertEqual(fields, {"major": "CS", "deadlines": {"Exam": "2025-04-10", "Essay": "2025-04-20"}, "name": "ana"})
+        with self.assertRaises(RosterError):
+            validate_profile({"major": "CS"})
+        with self.assertRaises(RosterError):
+            validate_profile({"user_id": "ana", "deadlines": "Exam=next week"})
+
+    def test_csv_import_in_batches_skips_invalid_rows(self):
+        path = self.write("roster.csv", (
+            "user_id,major,year_of_study,common_stressors,university,deadlines\n"
+            "ana,CS,2,exams,Centennial College,Exam=2025-04-10\n"
+            ",Biology,1,,,\n"
+            "ben,Biology,1,labs,University of Toronto,\"{\"\"Lab\"\": \"\"2025-05-01\"\"}\"\n"
+            "cy,Math,3,,,\n"
+        ))
+        errors = []
+        self.assertEqual(import_roster(self.store, path, batch_size=2, errors=errors), 3)
+        self.assertEqual(len(errors), 1)
+        self.assertIn("roster.csv:3", errors[0])
+        self.assertEqual(self.store.get("ben")["deadlines"], {"Lab": "2025-05-01"})
+        self.assertEqual(self.store.get("cy"), {"major": "Math", "year_of_study": "3", "name": "cy"})
+
+    def test_unreadable_rows_are_reported_and_skipped(self):
+        path = self.write("profiles.jsonl", (
+            '{"user_id": "ana", "major": "CS"}\n'
+            '{"user_id": "ben", \n'
+            '["cy", "Math"]\n'
+            '{"user_id": "dee", "deadlines": {"Exam": "2025-04-10"}}\n'
+        ))
+        errors = []
+        self.assertEqual(import_roster(self.store, path, batch_size=1, errors=errors), 2)
+        self.assertEqual([error.split(": ")[0] for error in errors], [f"{path}:2", f"{path}:3"])
+        self.assertEqual(self.store.get("dee")["deadlines"], {"Exam": "2025-04-10"})
+
+        path = self.write("roster.csv", "user_id,major\nana,CS\nben,Biology,extra\n")
+        errors = []
+        self.assertEqual(import_roster(self.store, path, errors=errors), 1)
+        self.assertEqual(errors, [f"{path}:3: more cells than header columns"])
+
+    def test_imported_deadlines_reach_the_reminder_index(self):
+        index = DeadlineIndex()
+        version, _ = self.store.changed_since(None)
+        import_roster(self.store, self.write("roster.csv", "user_id,deadlines\nana,Exam=2025-04-10\n"))
+        for user_id, profile in self.store.changed_since(version)[1]:
+            index.update(user_id, profile.get("deadlines", {}))
+        self.assertEqual(index.pop_due(date(2025, 4, 10)), {"ana": ["Exam"]})
+
+    def test_export_round_trips_through_jsonl_import(self):
+        self.store.update("ana", {"major": "CS", "last_emotion": "happy"})
+        exported = io.StringIO()
+        self.assertEqual(export_profiles(self.store, exported), 1)
+        self.assertEqual(json.loads(exported.getvalue()), {"user_id": "ana", "major": "CS", "last_emotion": "happy"})
+
+        other = SqliteProfileStore(os.path.join(self.tmp_dir, "copy.sqlite3"))
+        import_roster(other, self.write("profiles.jsonl", exported.getvalue()))
+        self.assertEqual(other.get("ana"), {"major": "CS", "last_emotion": "happy", "name": "ana"})
+        other.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+
+# Add the project's root directory to sys.path so we can import the main module.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sessions import Session, SessionStore, SqliteSessionStore, Turn
+
+class TestSessionsUnit(unittest.TestCase):
+    def setUp(self):
+        self.evicted = []
+        self.store = SessionStore(max_bytes=10000, ttl=60, on_evict=self.evicted.append)
+
+    def test_session_behaves_like_history(self):
+        session = Session("s1", "user1")
+        session.append(("Hi", "Hello!"))
+        session.append(("I'm stressed", "Let's talk."))
+        self.assertEqual(len(session), 2)
+        self.assertEqual(list(session[0]), ["Hi", "Hello!"])
+        self.assertEqual(session[1:], [Turn("I'm stressed", "Let's talk.")])
+        self.assertEqual([user for user, _ in session], ["Hi", "I'm stressed"])
+        self.assertEqual(session.ui_history[-1], {"role": "assistant", "content": "Let's talk."})
+
+    def test_streamed_turn_fills_placeholder(self):
+        session = Session("s1", "user1")
+        ui_history = session.start_turn("Hi")
+        ui_history[-1]["content"] = "Hel"
+        session.append(("Hi", "Hello!"))
+        self.assertIs(ui_history, session.ui_history)
+        self.assertEqual(session.ui_history, [
+            {"role": "user", "content": "Hi"},
+            {"role": "assistant", "content": "Hello!"},
+        ])
+
+    def test_cancelled_turn_removes_placeholder(self):
+        session = Session("s1", "user1")
+        session.append(("Hi", "Hello!"))
+        session.start_turn("Are you there?")
+        session.cancel_turn()
+        session.cancel_turn()  # No-op once the placeholder is gone
+        self.assertEqual(len(session.ui_history), 2)
+        self.assertEqual(session.ui_history[-1], {"role": "assistant", "content": "Hello!"})
+
+    def test_memory_cap_evicts_least_recently_used(self):
+        for session_id in ("s1", "s2", "s3"):
+            session = self.store.get(session_id, "user1")
+            session.append(("x" * 2000, "y" * 2000))
+            self.store.touch(session)
+        self.assertEqual(len(self.store), 2)
+        self.assertEqual(self.store.sweep(), 1)
+        self.assertEqual([session.session_id for session in self.evicted], ["s1"])
+        self.assertLessEqual(self.store.stats()["bytes"], 10000)
+
+    def test_idle_sessions_expire(self):
+        session = self.store.get("s1", "user1")
+        session.append(("Hi", "Hello!"))
+        self.store.touch(session)
+        self.store.get("empty", "user2")  # Nothing to persist
+        self.assertEqual(self.store.sweep(now=session.last_active + 30), 0)
+        self.assertEqual(self.store.sweep(now=session.last_active + 120), 1)
+        self.assertEqual(len(self.store), 0)
+        self.assertEqual(self.evicted, [session])
+
+    def test_new_user_starts_new_session(self):
+        session = self.store.get("s1", "user1")
+        session.append(("Hi", "Hello!"))
+        other = self.store.get("s1", "user2")
+        self.assertIsNot(session, other)
+        self.assertEqual(len(other), 0)
+        self.store.discard("s1")
+        self.store.sweep()
+        self.assertEqual(self.evicted, [session])
+
+class TestSqliteSessionStoreUnit(unittest.TestCase):
+    def setUp(self):
+        # Two stores on one file stand in for two worker processes
+        self.tmp_dir = tempfile.mkdtemp()
+        path = os.path.join(self.tmp_dir, "shared_state.sqlite3")
+        self.evicted = []
+        self.worker_a = SqliteSessionStore(path, max_bytes=10000, ttl=60, on_evict=self.evicted.append)
+        self.worker_b = SqliteSessionStore(path, max_bytes=10000, ttl=60, on_evict=self.evicted.append)
+
+    def tearDown(self):
+        self.worker_a.close()
+        self.worker_b.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_sessions_continue_on_another_worker(self):
+        session = self.worker_a.get("s1", "user1")
+        session.append(("Hi", "Hello!"))
+        self.worker_a.touch(session)
+
+        other = self.worker_b.get("s1", "user1")
+        self.assertEqual(list(other), [Turn("Hi", "Hello!")])
+        other.append(("Still there?", "Yes."))
+        self.worker_b.touch(other)
+
+        # Worker A reloads only because B added a turn
+        reloaded = self.worker_a.get("s1", "user1")
+        self.assertIsNot(reloaded, session)
+        self.assertEqual(len(reloaded), 2)
+        self.assertIs(self.worker_a.get("s1", "user1"), reloaded)
+        self.assertEqual(self.worker_b.stats()["sessions"], 1)
+
+    def test_each_evicted_session_is_claimed_once(self):
+        session = self.worker_a.get("s1", "user1")
+        session.append(("Hi", "Hello!"))
+        self.worker_a.touch(session)
+        later = time.time() + 120  # Shared stores go by the wall clock
+        self.assertEqual(self.worker_a.sweep(now=later) + self.worker_b.sweep(now=later), 1)
+        self.assertEqual([list(evicted) for evicted in self.evicted], [[Turn("Hi", "Hello!")]])
+        self.assertEqual(len(self.worker_b), 0)
+
+    def test_memory_cap_evicts_oldest_across_workers(self):
+        for store, session_id in ((self.worker_a, "s1"), (self.worker_b, "s2"), (self.worker_a, "s3")):
+            session = store.get(session_id, "user1")
+            session.append(("x" * 2000, "y" * 2000))
+            store.touch(session)
+        self.assertEqual(len(self.worker_b), 2)
+        self.worker_a.sweep()
+        self.assertEqual([session.session_id for session in self.evicted], ["s1"])
+        self.assertLessEqual(self.worker_b.stats()["bytes"], 10000)
+
+    def test_discard_and_user_change(self):
+        session = self.worker_a.get("s1", "user1")
+        session.append(("Hi", "Hello!"))
+        self.worker_a.touch(session)
+        self.assertEqual(len(self.worker_b.get("s1", "user2")), 0)  # Another user starts over
+        self.worker_b.discard("s1")
+        self.worker_b.sweep()
+        self.assertEqual([evicted.user_id for evicted in self.evicted], ["user1"])
+
+if __name__ == "__main__":
+    unittest.main()
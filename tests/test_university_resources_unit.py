@@ -0,0 +1,62 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+# Add the project's root directory to sys.path so we can import the main module.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from university_resources import ResourceIndex, normalize_institution
+
+RECORDS = [
+    {"name": "Centennial College", "resource": "centennial-help", "aliases": []},
+    {"name": "University of Toronto", "resource": "uoft-help", "aliases": ["U of T"]},
+    {"name": "University of Texas", "resource": "utexas-help", "aliases": ["UT Austin"]},
+]
+
+class TestUniversityResourcesUnit(unittest.TestCase):
+    def setUp(self):
+        self.index = ResourceIndex(RECORDS)
+
+    def test_normalize_institution(self):
+        self.assertEqual(normalize_institution("  The Université  de Montréal!"), "universite de montreal")
+        self.assertEqual(normalize_institution("Texas A&M"), "texas a and m")
+
+    def test_exact_aliases_and_abbreviations(self):
+        self.assertEqual(self.index.resolve("CENTENNIAL college"), "Centennial College")
+        self.assertEqual(self.index.resolve("Centennial"), "Centennial College")
+        self.assertEqual(self.index.resolve("u of t"), "University of Toronto")
+        self.assertEqual(self.index.resolve("UT Austin"), "University of Texas")
+        self.assertIsNone(self.index.resolve("UT"))  # Abbreviation shared by two institutions
+        self.assertEqual(self.index.resource("University of Toronto"), "uoft-help")
+
+    def test_fuzzy_fallback(self):
+        self.assertEqual(self.index.resolve("Centenial Colege"), "Centennial College")
+        self.assertEqual(self.index.resolve("University of Torronto"), "University of Toronto")
+        self.assertIsNone(self.index.resolve("Unknown Uni"))
+        self.assertIsNone(self.index.resolve("University"))
+        self.assertIsNone(self.index.resolve(""))
+
+    def test_shared_generic_words_do_not_match(self):
+        index = ResourceIndex.load(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "university_resources.json"))
+        for name in ("University of Ottawa", "University of Waterloo", "Toronto Metropolitan University",
+                     "University of Torino", "University of Trento"):
+            self.assertIsNone(index.resolve(name), name)
+        self.assertEqual(index.resolve("Universty of Torronto"), "University of Toronto")
+        self.assertEqual(index.resolve("Centennial Collage"), "Centennial College")
+
+    def test_load_csv(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp_dir, "resources.csv")
+            with open(path, "w") as file:
+                file.write("name,resource,aliases\nYork University,york-help,YorkU; York U\n")
+            index = ResourceIndex.load(path)
+            self.assertEqual(index.resolve("yorku"), "York University")
+            self.assertEqual(len(ResourceIndex.load(os.path.join(tmp_dir, "missing.json"))), 0)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+if __name__ == "__main__":
+    unittest.main()
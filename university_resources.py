@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import csv
+import json
+import threading
+import unicodedata
+
+# -------------------------------
+# University Resource Index
+# -------------------------------
+
+# Words left out of generated abbreviations and short names ("University of Toronto" -> "uoft", "toronto")
+STOP_WORDS = {"of", "the", "and", "at", "in", "for", "de", "du", "la"}
+GENERIC_WORDS = {"university", "college", "institute", "school", "polytechnic", "campus", "community"}
+# Minimum Dice similarity of trigram sets for a fuzzy match
+FUZZY_THRESHOLD = 0.6
+FUZZY_CACHE_SIZE = 10000  # Distinct misspellings remembered before the cache is reset
+# Bumped whenever matching changes, so names resolved by an older matcher are resolved again
+MATCHER_VERSION = 2
+
+_NON_WORD = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_institution(name):
+    """Fold case, accents, punctuation and spacing: "Université  Laval!" -> "universite laval"."""
+    text = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    text = _NON_WORD.sub(" ", text.lower().replace("&", " and "))
+    text = _WHITESPACE.sub(" ", text).strip()
+    return text[4:] if text.startswith("the ") else text
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def dice(a, b):
+    return 2 * len(a & b) / (len(a) + len(b)) if a or b else 0.0
+
+_GENERIC_TRIGRAMS = [trigrams(word) for word in GENERIC_WORDS]
+
+def distinctive_words(normalized, fuzzy=False):
+    """
+    The words that tell institutions apart: "university of toronto" -> "toronto".
+    With `fuzzy`, misspelled generic words ("colege") are dropped too.
+    """
+    words = []
+    for word in normalized.split():
+        if word in STOP_WORDS or word in GENERIC_WORDS:
+            continue
+        if fuzzy and any(dice(trigrams(word), generic) >= FUZZY_THRESHOLD for generic in _GENERIC_TRIGRAMS):
+            continue
+        words.append(word)
+    return " ".join(words)
+
+def generated_keys(normalized):
+    """Abbreviations and short names derived from a normalized institution name."""
+    words = normalized.split()
+    keys = set()
+    significant = [word for word in words if word not in STOP_WORDS]
+    if len(significant) > 1:
+        keys.add("".join(word[0] for word in significant))  # "university of toronto" -> "ut"
+        keys.add("".join(word[0] if word not in STOP_WORDS else word for word in words))  # -> "uoft"
+    distinctive = [word for word in significant if word not in GENERIC_WORDS]
+    if distinctive and len(distinctive) < len(significant):
+        keys.add(" ".join(distinctive))  # "centennial college" -> "centennial"
+    keys.discard(normalized)
+    return keys
+
+
+class ResourceIndex:
+    """
+    Institution names, aliases and abbreviations mapped to one canonical name
+    and its wellness resource. Exact lookups are one dict access on the
+    normalized name; anything else falls back to a trigram index that only
+    scores names sharing at least one trigram with the query. Fuzzy matching
+    compares distinctive words only, so the "university of" that most names
+    share cannot make "University of Ottawa" look like "University of Toronto".
+    """
+
+    def __init__(self, records):
+        self._resources = {}  # canonical name -> resource text
+        self._keys = {}  # normalized name/alias/abbreviation -> canonical name
+        self._trigram_index = {}  # trigram -> set of keys whose distinctive words contain it
+        self._trigram_counts = {}  # key -> number of distinct trigrams in its distinctive words
+        self._fuzzy_cache = {}
+        self._lock = threading.Lock()
+
+        generated = {}
+        for record in records:
+            canonical = record["name"]
+            self._resources[canonical] = record["resource"]
+            for name in [canonical] + list(record.get("aliases", [])):
+                self._keys[normalize_institution(name)] = canonical  # Explicit names always win
+            for key in generated_keys(normalize_institution(canonical)):
+                generated.setdefault(key, set()).add(canonical)
+        for key, canonicals in generated.items():
+            # An abbreviation shared by two institutions is ambiguous, so it is not indexed
+            if key not in self._keys and len(canonicals) == 1:
+                self._keys[key] = canonicals.pop()
+
+        for key in self._keys:
+            distinctive = distinctive_words(key)
+            if not distinctive:
+                continue
+            key_trigrams = trigrams(distinctive)
+            self._trigram_counts[key] = len(key_trigrams)
+            for trigram in key_trigrams:
+                self._trigram_index.setdefault(trigram, set()).add(key)
+
+    @classmethod
+    def load(cls, path):
+        """Read a JSON list of {name, resource, aliases} or a CSV with aliases separated by ";"."""
+        if not os.path.exists(path):
+            return cls([])
+        with open(path, "r", newline="", encoding="utf-8") as file:
+            if path.endswith(".csv"):
+                records = [
+                    {**row, "aliases": [alias.strip() for alias in (row.get("aliases") or "").split(";") if alias.strip()]}
+                    for row in csv.DictReader(file)
+                ]
+            else:
+                records = json.load(file)
+        return cls(records)
+
+    def __len__(self):
+        return len(self._resources)
+
+    def resource(self, canonical):
+        return self._resources.get(canonical)
+
+    def resolve(self, name):
+        """Canonical institution for a free-text name, or None if nothing is close enough."""
+        key = normalize_institution(name or "")
+        if not key:
+            return None
+        canonical = self._keys.get(key)
+        if canonical is not None:
+            return canonical
+        if all(word in GENERIC_WORDS or word in STOP_WORDS for word in key.split()):
+            return None  # "University" alone says nothing about which one
+        with self._lock:
+            if key in self._fuzzy_cache:
+                return self._fuzzy_cache[key]
+        canonical = self._fuzzy(key)
+        with self._lock:
+            if len(self._fuzzy_cache) >= FUZZY_CACHE_SIZE:
+                self._fuzzy_cache.clear()
+            self._fuzzy_cache[key] = canonical
+        return canonical
+
+    def _fuzzy(self, key):
+        distinctive = distinctive_words(key, fuzzy=True)
+        if not distinctive:
+            return None
+        query = trigrams(distinctive)
+        shared = {}
+        for trigram in query:
+            for candidate in self._trigram_index.get(trigram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+        best, best_score = None, FUZZY_THRESHOLD
+        for candidate, count in shared.items():
+            score = 2 * count / (len(query) + self._trigram_counts[candidate])
+            if score >= best_score:
+                best, best_score = candidate, score
+        return self._keys[best] if best is not None else None